@@ -0,0 +1,159 @@
+"""
+Benchmarks swapping the main branch of a conflict on deep reorgs
+
+Usage: python -m benchmarks.branch_swap
+"""
+
+from tcoin.tangle import Tangle, TangleState
+from tcoin.tangle.messages import Message, genesis_msg
+from tcoin.tangle.tangle import Branch, BranchManager
+
+from .utils import make_chain, print_table, timer
+
+DEPTHS = (100, 1000, 5000)
+
+
+def build(depth: int):
+    tangle = Tangle()
+
+    # Giving the issuers enough coins for both branches
+    for address in ("A", "B"):
+        tangle.state.set_balance(address, depth * 2)
+
+    main_msgs = make_chain("A", depth, receiver="RA")
+    conflict_msgs = make_chain("A", depth, receiver="RB", prefix="c")
+
+    for msg in main_msgs:
+        tangle.add_msg(msg)
+
+    main, conflict = Branch(main_msgs[0]), Branch(conflict_msgs[0])
+
+    main.add_msgs(main_msgs[1:])
+    conflict.add_msgs(conflict_msgs[1:])
+
+    manager = BranchManager("A", 0, main_branch=main)
+    tangle.add_branch(manager)
+
+    return tangle, manager, conflict
+
+
+class LegacyTangle:
+    """Dict based tangle that swaps branches the way it did before indexes"""
+
+    def __init__(self, tangle: Tangle):
+        self.state = TangleState(dict(tangle.state.wallets))
+
+        self.msgs = dict(tangle.msgs)
+        self.strong_tips = dict(tangle.strong_tips)
+        self.weak_tips = dict(tangle.weak_tips)
+
+    @property
+    def all_tips(self):
+        return {**self.strong_tips, **self.weak_tips}
+
+    @property
+    def all_msgs(self):
+        return {**self.msgs, **self.all_tips}
+
+    def get_msg(self, hash_str: str):
+        return self.all_msgs.get(hash_str, None)
+
+    def remove_msg(self, msg: Message):
+        for pool in (self.msgs, self.strong_tips, self.weak_tips):
+            if msg.hash in pool:
+                del pool[msg.hash]
+
+                self.state.update_tx_on_tangle(msg, add=False)
+
+                return
+
+    def add_approved_msg(self, msg: Message):
+        if msg.hash in self.msgs:
+            return
+
+        self.msgs[msg.hash] = msg
+
+        if msg.hash in self.all_tips:
+            self.strong_tips.pop(msg.hash, None)
+            self.weak_tips.pop(msg.hash, None)
+        else:
+            msg.update_state(self.state)
+
+    def find_children(self, msg_id: str, total: dict = None):
+        if total is None:
+            total = {}
+
+        # Scanning every message for each level of children
+        children = {
+            _id: m for _id, m in self.all_msgs.items() if msg_id in m.parents
+        }
+
+        total.update(children)
+
+        for c in children:
+            self.find_children(c, total)
+
+        return total
+
+    def add_msg(self, msg: Message):
+        for p in msg.parents:
+            if p == genesis_msg.hash:
+                continue
+
+            p_msg = self.get_msg(p)
+
+            # Getting the total amount of children of the parent tip
+            if len(self.find_children(p)) > 1:
+                self.add_approved_msg(p_msg)
+
+        if msg.hash not in self.all_msgs:
+            self.strong_tips[msg.hash] = msg
+
+            msg.update_state(self.state)
+
+    def swap_branch(self, old: Branch, new: Branch):
+        # Removing and re-adding every message of the branches
+        for msg in old.msgs.values():
+            self.remove_msg(msg)
+
+        for msg in list(new.msgs.values())[::-1]:
+            self.add_msg(msg)
+
+
+def main():
+    rows = []
+
+    for depth in DEPTHS:
+        legacy, differential = [], []
+
+        tangle, manager, conflict = build(depth)
+
+        legacy_tangle = LegacyTangle(tangle)
+
+        with timer(legacy):
+            legacy_tangle.swap_branch(manager.main_branch, conflict)
+
+        legacy_state = {
+            a: b for a, b in legacy_tangle.state.wallets.items() if b
+        }
+
+        with timer(differential):
+            tangle.swap_branch(manager.main_branch, conflict)
+
+        if tangle.state.wallets != legacy_state:
+            raise RuntimeError("Balances differ between the swap methods")
+
+        rows.append(
+            [
+                depth,
+                f"{legacy[0] * 1000:.1f}",
+                f"{differential[0] * 1000:.1f}",
+                f"{legacy[0] / differential[0]:.1f}x",
+            ]
+        )
+
+    print_table(["depth", "legacy (ms)", "differential (ms)", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
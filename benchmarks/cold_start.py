@@ -0,0 +1,119 @@
+"""
+Benchmarks loading a saved tangle from json (replaying every message or in
+bulk) and from a binary snapshot
+
+Usage: python -m benchmarks.cold_start
+"""
+
+import json
+import os
+import tempfile
+
+from tcoin.tangle import Tangle
+from tcoin.tangle.binary import load_binary, save_binary
+from tcoin.tangle.messages import Transaction, genesis_msg
+from tcoin.wallet import Wallet
+
+from .utils import print_table, timer
+
+SIZES = (1000, 10000, 50000)
+ISSUERS = 10
+PARENTS = 3
+
+
+def build(size: int) -> Tangle:
+    tangle = Tangle()
+
+    # Funding the issuers through the pruned history so both saves keep it
+    for i in range(ISSUERS):
+        tangle.snapshot.state.wallets[f"I{i}"] = size
+        tangle.state.set_balance(f"I{i}", size)
+
+    recent = [genesis_msg.hash] * PARENTS
+
+    for i in range(size):
+        issuer = i % ISSUERS
+
+        msg = Transaction(
+            node_id=f"I{issuer}",
+            index=i // ISSUERS,
+            payload={"receiver": f"R{i % 7}", "amt": 1},
+            parents={p: True for p in recent[-PARENTS:]},
+            timestamp=1700000000 + i,
+            hash=f"M{i}",
+            nonce=0,
+            signature="0",
+        )
+
+        tangle.add_msg(msg)
+        recent.append(msg.hash)
+
+    return tangle
+
+
+def main():
+    wallet = Wallet()
+    rows = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "tangle.json")
+        binary_path = os.path.join(tmp, "tangle.bin")
+
+        for size in SIZES:
+            tangle = build(size)
+
+            with open(json_path, "w") as f:
+                json.dump(tangle.to_dict(), f)
+
+            save_binary(binary_path, tangle)
+
+            replay_times, json_times, binary_times = [], [], []
+
+            with timer(replay_times):
+                with open(json_path, "r") as f:
+                    from_replay = Tangle.load_replay(json.load(f))
+
+            with timer(json_times):
+                with open(json_path, "r") as f:
+                    from_json = Tangle.from_dict(json.load(f), wallet)
+
+            with timer(binary_times):
+                from_binary, _ = load_binary(binary_path)
+
+            for t in (from_replay, from_json, from_binary):
+                if set(t.all_msgs) != set(tangle.all_msgs):
+                    raise RuntimeError("Messages differ after loading")
+
+                if t.state.wallets != tangle.state.wallets:
+                    raise RuntimeError("Balances differ after loading")
+
+            for t in (from_json, from_binary):
+                if t.store.status != tangle.store.status:
+                    raise RuntimeError("Statuses differ after loading")
+
+            rows.append(
+                [
+                    size,
+                    f"{os.path.getsize(json_path) / 1024:.0f}",
+                    f"{os.path.getsize(binary_path) / 1024:.0f}",
+                    f"{replay_times[0] * 1000:.1f}",
+                    f"{json_times[0] * 1000:.1f}",
+                    f"{binary_times[0] * 1000:.1f}",
+                ]
+            )
+
+    print_table(
+        [
+            "messages",
+            "json KiB",
+            "binary KiB",
+            "replay ms",
+            "json bulk ms",
+            "binary ms",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
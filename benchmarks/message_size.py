@@ -0,0 +1,112 @@
+"""
+Measures the memory used per message with objsize
+
+Usage: python -m benchmarks.message_size
+"""
+
+import json
+from hashlib import sha256
+
+from objsize import get_deep_size
+
+from tcoin.tangle.messages import message_lookup
+
+from .utils import print_table
+
+AMOUNT = 5000
+ISSUERS = 20
+PARENTS = 4
+
+
+class LegacySigned:
+    def __init__(self, hash: str = None, signature: str = None):
+        self.hash = hash
+        self.signature = signature
+
+
+class LegacyMessage(LegacySigned):
+    """Attributes of a message as they were set before it was made compact"""
+
+    def __init__(
+        self,
+        *,
+        node_id: str,
+        index: int,
+        payload: dict,
+        parents: dict[str, bool] = None,
+        nonce: int = None,
+        timestamp: int = None,
+        hash: str = None,
+        signature: str = None,
+    ):
+        super().__init__(hash, signature)
+
+        self.node_id = node_id
+        self.payload = payload
+        self.timestamp = timestamp
+
+        self.parents = parents
+        self.index = index
+        self.nonce = nonce
+
+
+def make_msgs_data() -> list[dict]:
+    addresses = [
+        f"T{sha256(str(i).encode()).hexdigest()[:44]}" for i in range(ISSUERS)
+    ]
+    hashes = [sha256(str(i).encode()).hexdigest() for i in range(AMOUNT)]
+
+    data = []
+
+    for i, h in enumerate(hashes):
+        parents = {hashes[max(i - j, 0)]: True for j in range(1, PARENTS + 1)}
+
+        data.append(
+            {
+                "node_id": addresses[i % ISSUERS],
+                "value": "transaction",
+                "payload": {
+                    "receiver": addresses[(i + 1) % ISSUERS],
+                    "amt": 1,
+                },
+                "timestamp": 1700000000 + i,
+                "hash": h,
+                "signature": "S" * 88,
+                "parents": parents,
+                "index": i // ISSUERS,
+                "nonce": i,
+            }
+        )
+
+    # Simulating messages that were received over the network
+    return [json.loads(json.dumps(d)) for d in data]
+
+
+def main():
+    data = make_msgs_data()
+
+    legacy = [
+        LegacyMessage(**{k: v for k, v in d.items() if k != "value"})
+        for d in make_msgs_data()
+    ]
+    compact = [message_lookup(d) for d in data]
+
+    if any(m.to_dict() != d for m, d in zip(compact, data)):
+        raise RuntimeError("Compact messages do not serialize identically")
+
+    # Shared objects such as interned strings are only counted once
+    legacy_size = get_deep_size(legacy) / AMOUNT
+    compact_size = get_deep_size(compact) / AMOUNT
+
+    print_table(
+        ["representation", "bytes / message"],
+        [
+            ["legacy", f"{legacy_size:.0f}"],
+            ["compact", f"{compact_size:.0f}"],
+            ["saving", f"{(1 - compact_size / legacy_size) * 100:.1f}%"],
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measures how many message signatures are verified per second by the
+verification pool with different amounts of workers
+
+Usage: python -m benchmarks.parallel_verification
+"""
+
+import os
+
+from tcoin.tangle.signed import SignatureCache, Signed
+from tcoin.tangle.verifier import SignatureVerifier, verify_chunk
+
+from .signature_verification import make_msgs, make_signed
+from .utils import print_table, timer
+
+AMOUNT = 800
+ISSUERS = 10
+
+
+def get_worker_counts() -> list[int]:
+    cores = os.cpu_count() or 1
+
+    counts = [1]
+
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+
+    if counts[-1] != cores:
+        counts.append(cores)
+
+    return counts
+
+
+def main():
+    signed = make_signed(ISSUERS) * (AMOUNT // 400)
+    msgs = make_msgs(signed)
+
+    inline = []
+
+    with timer(inline):
+        assert all(verify_chunk([(a, h, s) for a, h, s in signed]))
+
+    rows = [["inline", f"{len(msgs) / inline[0]:.0f}", "1.0x"]]
+
+    for workers in get_worker_counts():
+        verifier = SignatureVerifier(workers, min_batch=0)
+
+        # Starting the workers and warming their key caches
+        verifier.verify_many(msgs[: workers * ISSUERS * 8])
+
+        # Not letting the verified signatures be remembered between runs
+        Signed.signature_cache = SignatureCache(0)
+
+        results = []
+
+        with timer(results):
+            assert all(verifier.verify_many(msgs))
+
+        verifier.close()
+
+        rows.append(
+            [
+                workers,
+                f"{len(msgs) / results[0]:.0f}",
+                f"{inline[0] / results[0]:.1f}x",
+            ]
+        )
+
+    print(f"{os.cpu_count()} cores")
+
+    print_table(["workers", "msgs/s", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
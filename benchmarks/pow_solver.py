@@ -0,0 +1,117 @@
+"""
+Measures how many hashes per second the proof of work kernel tries compared
+to hashing every attempt from scratch and how long proof of work takes to
+solve on one core compared to the pool of processes with different amounts
+of workers
+
+Usage: python -m benchmarks.pow_solver
+"""
+
+import os
+
+from tcoin.utils.pow import (
+    PowSolver,
+    get_pow_hash,
+    get_target,
+    is_valid_hash,
+    pow,
+    search_nonces,
+)
+
+from .parallel_verification import get_worker_counts
+from .utils import print_table, timer
+
+DIFFICULTIES = (12, 14, 16, 18)
+RUNS = 4
+HASHES = 200_000
+
+
+def legacy_search(msg: str, target: int, start: int, end: int):
+    """Searches nonces the way proof of work did before the kernel"""
+
+    for nonce in range(start, end):
+        hash_result = get_pow_hash(msg, nonce)
+
+        if is_valid_hash(hash_result, target):
+            return hash_result, nonce
+
+    return None
+
+
+def compare_kernels():
+    msg = "benchmark-" * 40
+
+    # Only an empty hash is valid so that every nonce is tried
+    target = get_target(256)
+
+    rows = []
+
+    for name, search in (("legacy", legacy_search), ("kernel", search_nonces)):
+        results = []
+
+        with timer(results):
+            search(msg, target, 0, HASHES)
+
+        rows.append([name, f"{HASHES / results[0]:.0f}"])
+
+    base = float(rows[0][1])
+
+    for r in rows:
+        r.append(f"{float(r[1]) / base:.2f}x")
+
+    print_table(["search", "hashes/s", "speedup"], rows)
+
+
+def get_msgs(difficulty: int) -> list[str]:
+    return [f"benchmark-{difficulty}-{i}" for i in range(RUNS)]
+
+
+def main():
+    compare_kernels()
+
+    print()
+
+    counts = get_worker_counts()
+
+    rows = []
+
+    for difficulty in DIFFICULTIES:
+        msgs = get_msgs(difficulty)
+
+        inline = []
+
+        with timer(inline):
+            expected = [pow(m, difficulty) for m in msgs]
+
+        row = [difficulty, f"{inline[0] / RUNS * 1000:.1f}"]
+
+        for workers in counts:
+            solver = PowSolver(workers)
+
+            # Starting the workers before timing them
+            solver.solve_in_pool("warmup", 1)
+
+            results = []
+
+            with timer(results):
+                solved = [solver.solve_in_pool(m, difficulty) for m in msgs]
+
+            solver.close()
+
+            # The pool has to find the same nonces as a single core
+            assert solved == expected
+
+            row.append(f"{results[0] / RUNS * 1000:.1f}")
+
+        rows.append(row)
+
+    print(f"{os.cpu_count()} cores")
+
+    print_table(
+        ["difficulty", "inline (ms)", *(f"{w} workers (ms)" for w in counts)],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
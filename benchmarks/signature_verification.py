@@ -0,0 +1,142 @@
+"""
+Measures how many message signatures are verified per second with the
+verifying key and verified signature caches
+
+Usage: python -m benchmarks.signature_verification
+"""
+
+from base64 import b64decode
+from hashlib import sha256
+
+from base58 import b58decode
+from ecdsa import BadSignatureError, VerifyingKey
+
+from tcoin.constants import CURVE, PREFIX
+from tcoin.tangle.messages import Transaction
+from tcoin.tangle.signed import SignatureCache, Signed
+from tcoin.wallet import Wallet
+from tcoin.wallet.key_cache import VerifyingKeyCache
+
+from .utils import print_table, timer
+
+AMOUNT = 400
+ISSUERS = (1, 10, 100)
+CHECKS = (1, 3)  # times each message is checked (receipt, request, pending)
+
+
+def make_signed(issuers: int) -> list[tuple[str, str, str]]:
+    wallets = [Wallet() for _ in range(issuers)]
+
+    signed = []
+
+    for i in range(AMOUNT):
+        wallet = wallets[i % issuers]
+        msg_hash = sha256(str(i).encode()).hexdigest()
+
+        signed.append((wallet.address, msg_hash, wallet.sign(msg_hash)))
+
+    return signed
+
+
+def make_msgs(signed: list[tuple[str, str, str]]) -> list[Transaction]:
+    return [
+        Transaction(
+            node_id=address,
+            index=i,
+            payload={"receiver": address, "amt": 1},
+            parents={},
+            nonce=0,
+            hash=msg_hash,
+            signature=signature,
+        )
+        for i, (address, msg_hash, signature) in enumerate(signed)
+    ]
+
+
+def legacy_is_signature_valid(address: str, signature: str, msg: str):
+    """Parses the verifying key of the address for every signature"""
+
+    vk = VerifyingKey.from_string(
+        b58decode(address[len(PREFIX) :]), curve=CURVE
+    )
+
+    try:
+        vk.verify(b64decode(signature.encode()), msg.encode())
+    except BadSignatureError:
+        return False
+    else:
+        return True
+
+
+def main():
+    rows = []
+
+    for issuers in ISSUERS:
+        signed = make_signed(issuers)
+
+        legacy, cached = [], []
+
+        with timer(legacy):
+            for address, msg_hash, signature in signed:
+                assert legacy_is_signature_valid(address, signature, msg_hash)
+
+        Wallet.vk_cache = VerifyingKeyCache()
+
+        with timer(cached):
+            for address, msg_hash, signature in signed:
+                assert Wallet.is_signature_valid(address, signature, msg_hash)
+
+        rows.append(
+            [
+                issuers,
+                f"{AMOUNT / legacy[0]:.0f}",
+                f"{AMOUNT / cached[0]:.0f}",
+                f"{Wallet.vk_cache.stats['hit_rate'] * 100:.0f}%",
+                f"{legacy[0] / cached[0]:.1f}x",
+            ]
+        )
+
+    print_table(
+        [
+            "issuers",
+            "legacy msgs/s",
+            "cached keys msgs/s",
+            "hit rate",
+            "speedup",
+        ],
+        rows,
+    )
+
+    print()
+
+    msgs = make_msgs(make_signed(10))
+
+    rows = []
+
+    for checks in CHECKS:
+        uncached, cached = [], []
+
+        for results, size in ((uncached, 0), (cached, AMOUNT)):
+            Signed.signature_cache = SignatureCache(size)
+
+            with timer(results):
+                for _ in range(checks):
+                    for m in msgs:
+                        assert m.is_signature_valid
+
+        rows.append(
+            [
+                checks,
+                f"{AMOUNT / uncached[0]:.0f}",
+                f"{AMOUNT / cached[0]:.0f}",
+                f"{uncached[0] / cached[0]:.1f}x",
+            ]
+        )
+
+    print_table(
+        ["checks", "uncached msgs/s", "cached msgs/s", "speedup"], rows
+    )
+
+
+if __name__ == "__main__":
+    main()
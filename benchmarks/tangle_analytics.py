@@ -0,0 +1,104 @@
+"""
+Benchmarks aggregate queries over the tangle with and without the columns
+
+Usage: python -m benchmarks.tangle_analytics
+"""
+
+from tcoin.constants import TIME_WINDOW
+from tcoin.tangle import Tangle
+from tcoin.tangle.analytics import has_numpy
+
+from .utils import make_chain, print_table, timer
+
+SIZES = (1000, 10000, 50000)
+ISSUERS = 10
+
+
+def build(size: int) -> Tangle:
+    tangle = Tangle()
+
+    amt = size // ISSUERS
+
+    for i in range(ISSUERS):
+        tangle.state.set_balance(f"I{i}", amt)
+
+        chain = make_chain(
+            f"I{i}", amt, receiver=f"R{i % 3}", timestamp=1700000000 + i * 60
+        )
+
+        for msg in chain:
+            tangle.add_msg(msg)
+
+    tangle.enable_analytics()
+
+    return tangle
+
+
+def python_queries(tangle: Tangle):
+    sent = 0
+    changes = {}
+    windows = {}
+
+    for msg in tangle.all_msgs.values():
+        t = msg.get_transaction()
+        sent += t.amt
+
+        if msg.node_id != "0":
+            changes[msg.node_id] = changes.get(msg.node_id, 0) - t.amt
+
+        changes[t.receiver] = changes.get(t.receiver, 0) + t.amt
+
+        start = msg.timestamp // TIME_WINDOW * TIME_WINDOW
+        windows[start] = windows.get(start, 0) + 1
+
+    return sent, {a: c for a, c in changes.items() if c}, windows
+
+
+def columnar_queries(tangle: Tangle):
+    analytics = tangle.analytics
+
+    sent = analytics.total_sent()
+    changes = analytics.get_balance_changes()
+    windows = analytics.get_window_counts(TIME_WINDOW)
+
+    return sent, changes, windows
+
+
+def main():
+    if not has_numpy():
+        raise RuntimeError("numpy is required for this benchmark")
+
+    rows = []
+
+    for size in SIZES:
+        tangle = build(size)
+
+        python_times, columnar_times = [], []
+
+        for _ in range(5):
+            with timer(python_times):
+                expected = python_queries(tangle)
+
+            with timer(columnar_times):
+                result = columnar_queries(tangle)
+
+        if result != expected:
+            raise RuntimeError("Columnar queries returned different results")
+
+        python_time = min(python_times) * 1000
+        columnar_time = min(columnar_times) * 1000
+
+        rows.append(
+            [
+                size,
+                f"{python_time:.2f}",
+                f"{columnar_time:.2f}",
+                f"{python_time / columnar_time:.1f}x",
+            ]
+        )
+
+    print_table(["messages", "python ms", "columnar ms", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
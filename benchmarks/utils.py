@@ -0,0 +1,63 @@
+import time
+from contextlib import contextmanager
+
+from tcoin.tangle.messages import Transaction, genesis_msg
+
+
+def make_chain(
+    node_id: str,
+    amt: int,
+    *,
+    start_index: int = 0,
+    parent: str = genesis_msg.hash,
+    receiver: str = "T0",
+    timestamp: int = None,
+    prefix: str = "",
+) -> list[Transaction]:
+    """Creates a chain of unsigned transactions without doing any work"""
+
+    if timestamp is None:
+        timestamp = int(time.time())
+
+    msgs = []
+
+    for i in range(amt):
+        msg = Transaction(
+            node_id=node_id,
+            index=start_index + i,
+            payload={"receiver": receiver, "amt": 1},
+            parents={parent: True},
+            timestamp=timestamp,
+            hash=f"{prefix}{node_id}-{start_index + i}",
+            nonce=0,
+            signature="0",
+        )
+
+        parent = msg.hash
+        msgs.append(msg)
+
+    return msgs
+
+
+@contextmanager
+def timer(results: list[float]):
+    start = time.perf_counter()
+
+    yield
+
+    results.append(time.perf_counter() - start)
+
+
+def print_table(headers: list[str], rows: list[list]):
+    widths = [
+        max(len(str(x)) for x in [h, *(r[i] for r in rows)])
+        for i, h in enumerate(headers)
+    ]
+
+    def fmt(row):
+        return "  ".join(str(x).rjust(w) for x, w in zip(row, widths))
+
+    print(fmt(headers))
+
+    for r in rows:
+        print(fmt(r))
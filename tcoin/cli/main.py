@@ -64,11 +64,15 @@ def node_stats(_, node: Node):
 
 
 def tangle_stats(tangle: Tangle, _):
-    sent = 0
+    if tangle.analytics is not None:
+        sent = tangle.analytics.total_sent(approved_only=True)
 
-    for t in tangle.msgs.values():
-        if isinstance(t, Transaction):
-            sent += t.get_transaction().amt
+    else:
+        sent = 0
+
+        for t in tangle.msgs.values():
+            if isinstance(t, Transaction):
+                sent += t.get_transaction().amt
 
     msg_total = len(tangle.all_msgs)
     unverified = len(tangle.all_tips)
@@ -191,7 +195,7 @@ def view_msg(tangle: Tangle, _):
         validate=EmptyInputValidator(),
     ).execute()
 
-    msg = tangle.get_msg(msg_hash)
+    msg = tangle.lookup_msg(msg_hash)
 
     if msg is None:
         return Send.fail("A message with that hash does not exist")
@@ -201,6 +205,26 @@ def view_msg(tangle: Tangle, _):
     Send.success(f"\n{formatted_data}")
 
 
+def view_history(tangle: Tangle, node: Node):
+    address = inquirer.text(message="Address:").execute()
+
+    if not address:
+        address = node.wallet.address
+
+    history = tangle.get_address_history(address, limit=20)
+
+    if not history:
+        return Send.fail("That address has no messages")
+
+    for msg in history:
+        t = msg.get_transaction()
+
+        if msg.node_id == address:
+            Send.secondary(f"{msg.hash}: sent {t.amt} to {t.receiver}")
+        else:
+            Send.success(f"{msg.hash}: received {t.amt} from {msg.node_id}")
+
+
 @app.command()
 def start():
     port = inquirer.number(
@@ -253,6 +277,7 @@ def start():
         "Tangle": {
             "Tangle Stats": tangle_stats,
             "View Message": view_msg,
+            "Address History": view_history,
             "Balance": view_balance,
         },
         "Send": send,
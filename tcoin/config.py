@@ -1,10 +1,38 @@
 # Storage
 storage_path = "storage"
 secure_storage = False
+storage_backend = "json"  # json, binary or sqlite
+wal_batch_size = 100  # events written before syncing the log to the disk
+wal_sync_interval = 1.0
+checkpoint_interval = 60 * 5  # seconds between background saves of the tangle
+
+# Wallet
+vk_cache_size = 1024  # verifying keys kept in memory
+vk_precompute_after = 8  # lookups before a key's tables are precomputed
+signature_cache_size = 4096  # verified signatures that are remembered
+verify_workers = 0  # processes verifying signatures (0 for one per core)
+verify_min_batch = 16  # smaller batches are verified on the calling thread
+
+# Proof of work
+pow_workers = 0  # processes solving proof of work (0 for one per core)
+
+# Analytics
+tangle_analytics = False  # numpy tangle stats (needs the analytics extra)
 
 # Node
 request_children_after = 60 * 60 * 24
 max_tips_requested = 100
+tip_purge_interval = 60
+tip_selection = "uniform"  # uniform or weighted-walk
+
+# Weighted walk tip selection
+walk_alpha = 0.5
+max_walk_steps = 100
+walk_window = 60 * 10
+
+# History pruning
+prune_interval = 60 * 10
+prune_after = 60 * 60 * 2  # must be longer than the max parent age
 
 # Invalid message pool
 invalid_msg_pool_size = 500
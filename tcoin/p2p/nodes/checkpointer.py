@@ -0,0 +1,71 @@
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from tcoin.config import checkpoint_interval
+
+from .threaded import Threaded
+
+if TYPE_CHECKING:
+    from .node import Node
+
+
+class Checkpointer(Threaded):
+    """
+    Periodically saves the tangle in the background
+
+    The tangle is only locked while it is copied so the scheduler can keep
+    processing messages while the copy is serialized and written.
+    """
+
+    def __init__(self, node: "Node", interval: float = checkpoint_interval):
+        super().__init__()
+
+        self.node = node
+        self.interval = interval
+
+        # Metrics
+        self.checkpoints = 0
+        self.failures = 0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+        self.last_size = 0
+
+    def checkpoint(self):
+        start = time.perf_counter()
+
+        try:
+            size = self.node.tangle.checkpoint(self.node.wallet)
+
+        except Exception as e:
+            self.failures += 1
+            logging.exception(e)
+            return
+
+        duration = time.perf_counter() - start
+
+        self.checkpoints += 1
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+        self.total_duration += duration
+        self.last_size = size
+
+        logging.debug(
+            f"Saved a {size} byte checkpoint of the tangle in {duration:.3f}s"
+        )
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "checkpoints": self.checkpoints,
+            "failures": self.failures,
+            "last_duration": self.last_duration,
+            "max_duration": self.max_duration,
+            "average_duration": self.total_duration / max(self.checkpoints, 1),
+            "last_size": self.last_size,
+        }
+
+    def run(self):
+        while not self.terminate_flag.wait(self.interval):
+            self.checkpoint()
@@ -4,16 +4,21 @@ import socket
 import string
 import time
 
-from tcoin.config import request_children_after
+from tcoin.config import request_children_after, tip_selection
 from tcoin.tangle import BranchReference, Tangle
-from tcoin.tangle.messages import Message, message_lookup
-from tcoin.utils import load_storage_file, save_storage_file
+from tcoin.tangle.messages import Message, genesis_msg, message_lookup
+from tcoin.tangle.tip_selection import tip_selectors
+from tcoin.tangle.verifier import verifier, verify_many
+from tcoin.utils import load_storage_file, pow_solver, save_storage_file
 from tcoin.wallet import Wallet
 
 from ..requests import DiscoverPeers, GetMsgs, Request, request_lookup
+from .checkpointer import Checkpointer
 from .node_connection import NodeConnection
+from .pruner import Pruner
 from .scheduler import Scheduler
 from .threaded import Threaded
+from .tip_purger import TipPurger
 
 KNOWN_PEERS_FILE_NAME = "known_peers"
 
@@ -28,6 +33,7 @@ class Node(Threaded):
         wallet: Wallet,
         full_node: bool = False,
         max_connections: int = 30,
+        tip_selection: str = tip_selection,
     ):
         super().__init__()
 
@@ -36,6 +42,10 @@ class Node(Threaded):
 
         self.tangle = tangle
 
+        # Using the tip selection strategy chosen for this node
+        if tip_selection != self.tangle.tip_selector.name:
+            self.tangle.set_tip_selector(tip_selectors[tip_selection]())
+
         self.wallet = wallet
 
         # Connections
@@ -53,6 +63,9 @@ class Node(Threaded):
         self.init_server()
 
         self.scheduler = Scheduler(self)
+        self.tip_purger = TipPurger(self)
+        self.pruner = Pruner(self)
+        self.checkpointer = Checkpointer(self)
 
     @property
     def all_nodes(self):
@@ -214,6 +227,10 @@ class Node(Threaded):
         if msg.hash in self.tangle.all_msgs:
             return True
 
+        # Ignoring messages behind the snapshot
+        if self.tangle.is_pruned(msg):
+            return True
+
         # Checking if the message has already been queued
         if msg.hash in self.scheduler.queue.get(msg.node_id, {}):
             return True
@@ -230,18 +247,37 @@ class Node(Threaded):
         return True
 
     def serialize_msg(self, data: dict):
-        msg = message_lookup(data)
-
-        if msg is None:
-            return False
-
-        # Semantically validate the message
-        is_sem_valid = msg.is_sem_valid()
-
-        if is_sem_valid is False:
-            return False
-
-        return msg
+        return self.serialize_msgs([data])[0]
+
+    def serialize_msgs(self, data: list[dict]) -> list[Message | bool]:
+        msgs = [
+            message_lookup(d) if isinstance(d, dict) else None for d in data
+        ]
+
+        # Running the cheap checks first so only the signatures of well
+        # formed messages with enough work are verified
+        msgs = [
+            None
+            if m is None or m.is_sem_valid(check_signature=False) is False
+            else m
+            for m in msgs
+        ]
+
+        genesis_data = genesis_msg.to_dict()
+
+        # Verifying the signatures together so that it can be done in parallel
+        # (only the exact genesis message is unsigned, as in is_sem_valid)
+        checked = [
+            i
+            for i, m in enumerate(msgs)
+            if m is not None and m.to_dict() != genesis_data
+        ]
+
+        for i, valid in zip(checked, verify_many([msgs[i] for i in checked])):
+            if not valid:
+                msgs[i] = None
+
+        return [False if m is None else m for m in msgs]
 
     def add_new_msg(self, msg: Message):
         if msg.hash in self.tangle.all_msgs:
@@ -320,10 +356,25 @@ class Node(Threaded):
                     # Checking if the payload is valid with the new state
                     if msg.is_payload_valid(new_state):
                         r.branch.add_msg(msg, invalid_parents)
+
+                        self.tangle.log_branch(
+                            "branch_msg",
+                            r.manager,
+                            branch=r.branch.id,
+                            msg=msg.to_dict(),
+                            invalid_parents=list(invalid_parents),
+                        )
                     else:
                         # Adding to invalid messages in the branch
                         r.branch.state.add_invalid_msg(msg.hash)
 
+                        self.tangle.log_branch(
+                            "branch_invalid_msg",
+                            r.manager,
+                            branch=r.branch.id,
+                            hash=msg.hash,
+                        )
+
                     # Updating the branch
                     self.tangle.branches[r.manager.id].update_conflict(
                         self.tangle, r.branch
@@ -384,9 +435,19 @@ class Node(Threaded):
         except Exception:
             return None
 
+    def stop(self):
+        super().stop()
+
+        # Waiting for the workers so that the tangle can be saved after
+        if self.is_alive():
+            self.join()
+
     def run(self):
         # Starting the scheduler
         self.scheduler.start()
+        self.tip_purger.start()
+        self.pruner.start()
+        self.checkpointer.start()
 
         while not self.terminate_flag.is_set():
             try:
@@ -423,8 +484,16 @@ class Node(Threaded):
 
             time.sleep(0.01)
 
+        workers = (
+            self.scheduler,
+            self.tip_purger,
+            self.pruner,
+            self.checkpointer,
+        )
+
         # Stopping the scheduler
-        self.scheduler.stop()
+        for worker in workers:
+            worker.stop()
 
         for node in self.all_nodes.values():
             node.stop()
@@ -434,7 +503,18 @@ class Node(Threaded):
         for node in self.all_nodes.values():
             node.join()
 
+        # Waiting for a checkpoint that is being written to finish
+        for worker in workers:
+            worker.join()
+
         self.sock.settimeout(None)
         self.sock.close()
 
+        # Making sure the logged changes reach the disk
+        if self.tangle.storage is not None:
+            self.tangle.storage.sync()
+
+        verifier.close()
+        pow_solver.close()
+
         logging.info("Node stopped")
@@ -0,0 +1,44 @@
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from tcoin.config import prune_after, prune_interval
+from tcoin.utils import append_storage_file
+
+from .threaded import Threaded
+
+if TYPE_CHECKING:
+    from .node import Node
+
+ARCHIVE_PATH = "archive"
+
+
+class Pruner(Threaded):
+    """
+    Periodically moves finalized history into the tangle's snapshot
+
+    Full nodes archive the pruned messages to disk while other nodes
+    discard them.
+    """
+
+    def __init__(self, node: "Node", interval: float = prune_interval):
+        super().__init__()
+
+        self.node = node
+        self.interval = interval
+
+    def prune(self):
+        with self.node.tangle.lock:
+            pruned = self.node.tangle.prune(int(time.time()) - prune_after)
+
+        if not pruned:
+            return
+
+        if self.node.full_node:
+            append_storage_file(ARCHIVE_PATH, [m.to_dict() for m in pruned])
+
+        logging.debug(f"Pruned {len(pruned)} finalized messages")
+
+    def run(self):
+        while not self.terminate_flag.wait(self.interval):
+            self.prune()
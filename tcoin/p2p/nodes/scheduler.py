@@ -217,8 +217,9 @@ class Scheduler(Threaded):
         if self.queue[msg.node_id] == {}:
             del self.queue[msg.node_id]
 
-        # Processing the message
-        self.node.add_new_msg(msg)
+        # Processing the message while no checkpoint is copying the tangle
+        with self.node.tangle.lock:
+            self.node.add_new_msg(msg)
 
         self.update_score(msg.node_id)
 
@@ -0,0 +1,22 @@
+from typing import TYPE_CHECKING
+
+from tcoin.config import tip_purge_interval
+
+from .threaded import Threaded
+
+if TYPE_CHECKING:
+    from .node import Node
+
+
+class TipPurger(Threaded):
+    """Periodically purges expired tips so that tip selection stays cheap"""
+
+    def __init__(self, node: "Node", interval: float = tip_purge_interval):
+        super().__init__()
+
+        self.node = node
+        self.interval = interval
+
+    def run(self):
+        while not self.terminate_flag.wait(self.interval):
+            self.node.tangle.purge_tips()
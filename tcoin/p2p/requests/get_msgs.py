@@ -80,6 +80,22 @@ class GetMsgs(Request):
         if pending is None:
             return
 
+        returned = [
+            _id
+            for _id, m in msgs.items()
+            if m is not None
+            and _id in pending.missing
+            and _id in requested_msgs
+        ]
+
+        # Serializing the returned messages together to verify them in parallel
+        serialized = dict(
+            zip(
+                returned,
+                client.serialize_msgs([msgs[_id] for _id in returned]),
+            )
+        )
+
         for _id, m in msgs.items():
             # Checking if the message is still pending
             if _id not in pending.missing:
@@ -90,8 +106,10 @@ class GetMsgs(Request):
                 continue
 
             if m is not None:
+                m = serialized[_id]
+
                 # Checking if the returned message is serializable
-                if (m := client.serialize_msg(m)) is False:
+                if m is False:
                     continue
 
             # Casting for the message
@@ -1 +1,6 @@
-from .tangle import BranchReference, Tangle, TangleState
+from .tangle import (
+    BranchReference,
+    LayeredTangleState,
+    Tangle,
+    TangleState,
+)
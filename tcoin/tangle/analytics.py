@@ -0,0 +1,284 @@
+from typing import TYPE_CHECKING
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+if TYPE_CHECKING:
+    from .messages import Message
+
+# Initial amount of rows allocated for each column
+INITIAL_CAPACITY = 1024
+
+# Issuer of the genesis message which does not lose what it sends
+GENESIS_ISSUER = "0"
+
+# Name, type and empty value of every column
+COLUMNS = (
+    ("timestamps", "int64", 0),
+    ("issuers", "int32", 0),
+    ("receivers", "int32", -1),  # -1 if the message isn't a transaction
+    ("amounts", "int64", 0),
+    ("weights", "int64", 0),
+    ("approved", "bool", False),
+    ("alive", "bool", False),
+)
+
+
+def has_numpy() -> bool:
+    return np is not None
+
+
+class ColumnarView:
+    """
+    Keeps the fields of the tangle's messages in numpy columns so that
+    aggregate queries don't have to loop over every message in python
+
+    Addresses are stored as ids into the address list and removed messages
+    are only marked as dead until they make up half of the rows.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        if np is None:
+            raise RuntimeError("numpy is required for the columnar view")
+
+        self.size = 0
+        self.dead = 0
+
+        self.allocate(capacity)
+
+        self.rows: dict[str, int] = {}  # hash: row
+        self.hashes: list[str | None] = []  # row: hash
+
+        self.addresses: list[str] = []  # id: address
+        self.address_ids: dict[str, int] = {}  # address: id
+
+    def __len__(self) -> int:
+        return self.size - self.dead
+
+    def __contains__(self, msg_hash: str) -> bool:
+        return msg_hash in self.rows
+
+    def get_address_id(self, address: str) -> int:
+        _id = self.address_ids.get(address, None)
+
+        if _id is None:
+            _id = len(self.addresses)
+
+            self.addresses.append(address)
+            self.address_ids[address] = _id
+
+        return _id
+
+    def allocate(self, capacity: int, rows=None):
+        """Creates the columns, copying the used (or given) rows over"""
+
+        for name, dtype, fill in COLUMNS:
+            column = np.full(capacity, fill, dtype=dtype)
+            old = getattr(self, name, None)
+
+            if old is not None:
+                kept = old[: self.size] if rows is None else old[rows]
+                column[: len(kept)] = kept
+
+            setattr(self, name, column)
+
+    def add(self, msg: "Message", approved: bool = False):
+        if msg.hash in self.rows:
+            return
+
+        if self.size == len(self.timestamps):
+            self.allocate(self.size * 2)
+
+        i = self.size
+
+        self.timestamps[i] = msg.timestamp
+        self.issuers[i] = self.get_address_id(msg.address)
+        self.weights[i] = msg.approval_weight
+        self.approved[i] = approved
+        self.alive[i] = True
+
+        # Only transactions move coins between addresses
+        receiver = msg.payload.get("receiver", None)
+        amt = msg.payload.get("amt", None)
+
+        if isinstance(receiver, str) and isinstance(amt, int):
+            self.receivers[i] = self.get_address_id(receiver)
+            self.amounts[i] = amt
+
+        self.rows[msg.hash] = i
+        self.hashes.append(msg.hash)
+        self.size += 1
+
+    def add_many(self, msgs: list["Message"], approved: list[bool]):
+        """Appends the rows of many messages at once"""
+
+        msgs = [m for m in msgs if m.hash not in self.rows]
+
+        if not msgs:
+            return
+
+        start, end = self.size, self.size + len(msgs)
+
+        if end > len(self.timestamps):
+            self.allocate(max(end, self.size * 2))
+
+        receivers, amounts = [], []
+
+        for m in msgs:
+            receiver = m.payload.get("receiver", None)
+            amt = m.payload.get("amt", None)
+
+            # Only transactions move coins between addresses
+            if isinstance(receiver, str) and isinstance(amt, int):
+                receivers.append(self.get_address_id(receiver))
+                amounts.append(amt)
+            else:
+                receivers.append(-1)
+                amounts.append(0)
+
+        rows = slice(start, end)
+
+        self.timestamps[rows] = [m.timestamp for m in msgs]
+        self.issuers[rows] = [self.get_address_id(m.address) for m in msgs]
+        self.receivers[rows] = receivers
+        self.amounts[rows] = amounts
+        self.weights[rows] = [m.approval_weight for m in msgs]
+        self.approved[rows] = approved
+        self.alive[rows] = True
+
+        for i, m in enumerate(msgs, start):
+            self.rows[m.hash] = i
+
+        self.hashes += [m.hash for m in msgs]
+        self.size = end
+
+    def set_approved(self, msg_hash: str, approved: bool = True):
+        i = self.rows.get(msg_hash, None)
+
+        if i is not None:
+            self.approved[i] = approved
+
+    def remove(self, msg_hash: str):
+        i = self.rows.pop(msg_hash, None)
+
+        if i is None:
+            return
+
+        self.alive[i] = False
+        self.hashes[i] = None
+        self.dead += 1
+
+        if self.dead * 2 > self.size:
+            self.compact()
+
+    def compact(self):
+        """Drops the rows of removed messages"""
+
+        keep = np.flatnonzero(self.alive[: self.size])
+
+        self.allocate(max(INITIAL_CAPACITY, len(keep) * 2), keep)
+
+        self.hashes = [self.hashes[i] for i in keep]
+        self.rows = {h: i for i, h in enumerate(self.hashes)}
+
+        self.size = len(keep)
+        self.dead = 0
+
+    def get_mask(self, *, approved_only: bool = False):
+        mask = self.alive[: self.size]
+
+        if approved_only:
+            mask = mask & self.approved[: self.size]
+
+        return mask
+
+    def total_sent(self, *, approved_only: bool = False) -> int:
+        mask = self.get_mask(approved_only=approved_only)
+
+        return int(self.amounts[: self.size][mask].sum())
+
+    def total_weight(self, *, approved_only: bool = False) -> int:
+        mask = self.get_mask(approved_only=approved_only)
+
+        return int(self.weights[: self.size][mask].sum())
+
+    def get_flows(
+        self, *, approved_only: bool = False
+    ) -> dict[str, tuple[int, int]]:
+        """Amount sent and received by each address"""
+
+        mask = self.get_mask(approved_only=approved_only) & (
+            self.receivers[: self.size] >= 0
+        )
+
+        issuers = self.issuers[: self.size][mask]
+        receivers = self.receivers[: self.size][mask]
+        amounts = self.amounts[: self.size][mask]
+
+        length = len(self.addresses)
+
+        sent = np.bincount(issuers, weights=amounts, minlength=length)
+        received = np.bincount(receivers, weights=amounts, minlength=length)
+
+        return {
+            self.addresses[i]: (int(sent[i]), int(received[i]))
+            for i in np.flatnonzero(sent + received)
+        }
+
+    def get_balance_changes(self, *, approved_only: bool = False):
+        """Change to the balance of each address caused by the messages"""
+
+        changes = {}
+
+        for address, (sent, received) in self.get_flows(
+            approved_only=approved_only
+        ).items():
+            if address == GENESIS_ISSUER:
+                sent = 0
+
+            if received != sent:
+                changes[address] = received - sent
+
+        return changes
+
+    def get_issuer_counts(self, *, approved_only: bool = False):
+        mask = self.get_mask(approved_only=approved_only)
+
+        counts = np.bincount(
+            self.issuers[: self.size][mask], minlength=len(self.addresses)
+        )
+
+        return {
+            self.addresses[i]: int(counts[i]) for i in np.flatnonzero(counts)
+        }
+
+    def count_in_window(
+        self, start: int, end: int, *, address: str = None
+    ) -> int:
+        """Amount of messages with a timestamp in [start, end)"""
+
+        timestamps = self.timestamps[: self.size]
+
+        mask = self.get_mask() & (timestamps >= start) & (timestamps < end)
+
+        if address is not None:
+            _id = self.address_ids.get(address, None)
+
+            if _id is None:
+                return 0
+
+            mask &= self.issuers[: self.size] == _id
+
+        return int(mask.sum())
+
+    def get_window_counts(self, window: int) -> dict[int, int]:
+        """Amount of messages in each window of time that has any"""
+
+        timestamps = self.timestamps[: self.size][self.get_mask()]
+
+        # Windows start at multiples of their length and empty ones are left out
+        starts, counts = np.unique(timestamps // window, return_counts=True)
+
+        return {int(s) * window: int(c) for s, c in zip(starts, counts)}
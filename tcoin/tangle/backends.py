@@ -0,0 +1,619 @@
+import json
+import os
+import sqlite3
+import time
+from threading import RLock
+from typing import TYPE_CHECKING
+
+from tcoin.config import (
+    secure_storage,
+    storage_path,
+    wal_batch_size,
+    wal_sync_interval,
+)
+from tcoin.utils import WriteAheadLog, load_storage_file, save_storage_file
+from tcoin.wallet import Wallet
+
+from .binary import load_binary, save_binary
+from .messages import Message, message_lookup
+
+if TYPE_CHECKING:
+    from .tangle import Tangle
+
+TANGLE_PATH = "tangle"
+WAL_PATH = "tangle"
+DATABASE_PATH = "tangle"
+
+# Events that change a single (possibly nested) branch manager
+BRANCH_EVENTS = (
+    "add_branch",
+    "add_conflict",
+    "set_main_branch",
+    "remove_branch",
+    "branch_msg",
+    "branch_invalid_msg",
+    "remove_branch_msgs",
+)
+
+
+class StorageBackend:
+    """Persists the tangle and the changes made to it between saves"""
+
+    name: str = ...
+
+    def attach(self, tangle: "Tangle"):
+        """Called when the backend starts storing a tangle"""
+        ...
+
+    def log_event(self, event_type: str, **data):
+        ...
+
+    def save(self, tangle: "Tangle", wallet: Wallet):
+        """Saves a tangle that was just signed with the wallet"""
+        ...
+
+    def load(self, wallet: Wallet) -> "Tangle":
+        ...
+
+    def checkpoint(self, tangle: "Tangle", wallet: Wallet) -> int:
+        """
+        Saves the tangle from a background thread, only holding its lock
+        for as long as it takes to copy. Returns the size of the save.
+        """
+        ...
+
+    def get_msg(self, msg_hash: str) -> Message | None:
+        """Finds a message that may no longer be in the tangle"""
+
+        return None
+
+    def get_address_history(self, address: str, limit: int = None):
+        """Messages sent or received by an address (None if unsupported)"""
+
+        return None
+
+    def is_pruned(self, msg_hash: str) -> bool:
+        """Whether a message was pruned (only known for stored history)"""
+
+        return False
+
+    def sync(self):
+        ...
+
+    def close(self):
+        ...
+
+
+class JsonBackend(StorageBackend):
+    """Saves the whole tangle as json and logs the changes since the save"""
+
+    name = "json"
+
+    def __init__(self):
+        self.wal = WriteAheadLog(WAL_PATH)
+
+        # Held while a save is written and the log is emptied up to it
+        self.lock = RLock()
+
+        # Last event included in the save on disk
+        self.saved_seq = 0
+
+        # Wallet that the tangle and the log are signed with
+        self.wallet: Wallet | None = None
+
+    def set_wallet(self, wallet: Wallet):
+        self.wallet = wallet
+
+        # Sealing every synced batch of the log with the wallet
+        self.wal.signer = wallet.sign
+
+    def is_seal_valid(self, root: str, signature: str) -> bool:
+        return Wallet.is_signature_valid(self.wallet.address, signature, root)
+
+    def log_event(self, event_type: str, **data):
+        self.wal.append(event_type, **data)
+
+    def save(self, tangle: "Tangle", wallet: Wallet):
+        self.set_wallet(wallet)
+        self.write(tangle, self.wal.seq)
+
+    def checkpoint(self, tangle: "Tangle", wallet: Wallet) -> int:
+        self.set_wallet(wallet)
+
+        with tangle.lock:
+            copy = tangle.copy()
+            seq = self.wal.seq
+
+        # Signing the copy as the tangle may have changed since
+        copy.add_hash()
+        copy.sign(wallet)
+
+        return self.write(copy, seq)
+
+    def write(self, tangle: "Tangle", seq: int) -> int:
+        with self.lock:
+            # Checkpoints copied before a newer save can't overwrite it
+            if seq < self.saved_seq:
+                return 0
+
+            size = self.write_file(tangle, seq)
+
+            # The logged events are part of the save now
+            self.wal.reset(upto=seq)
+
+            self.saved_seq = seq
+
+        return size
+
+    def write_file(self, tangle: "Tangle", seq: int) -> int:
+        # Saving the tangle along with the last event it includes
+        return save_storage_file(
+            TANGLE_PATH, {**tangle.to_dict(), "wal_seq": seq}
+        )
+
+    def load(self, wallet: Wallet) -> "Tangle":
+        from .tangle import Tangle
+
+        tangle_data = load_storage_file(TANGLE_PATH)
+
+        tangle = Tangle.from_dict(tangle_data, wallet)
+
+        self.replay(tangle, wallet, tangle_data.get("wal_seq", 0))
+
+        return tangle
+
+    def replay(self, tangle: "Tangle", wallet: Wallet, after: int):
+        """Applies the changes that were logged after the save"""
+
+        self.set_wallet(wallet)
+        self.saved_seq = after
+
+        # Only trusting the events that were sealed by the wallet
+        verify = self.is_seal_valid if secure_storage else None
+
+        for event in self.wal.replay(after=after, verify=verify):
+            tangle.replay_event(event)
+
+    def sync(self):
+        self.wal.sync()
+
+    def close(self):
+        self.wal.close()
+
+
+class BinaryBackend(JsonBackend):
+    """Saves the tangle as a binary snapshot that is restored without replay"""
+
+    name = "binary"
+
+    def __init__(self, path: str = None):
+        super().__init__()
+
+        if path is None:
+            path = f"{storage_path}/{TANGLE_PATH}.bin"
+
+        self.path = path
+
+    def write_file(self, tangle: "Tangle", seq: int) -> int:
+        if not os.path.exists(storage_path):
+            os.mkdir(storage_path)
+
+        return save_binary(self.path, tangle, {"wal_seq": seq})
+
+    def load(self, wallet: Wallet) -> "Tangle":
+        # Falling back to the json save when there is no binary one yet
+        if not os.path.exists(self.path):
+            return super().load(wallet)
+
+        tangle, meta = load_binary(self.path)
+
+        tangle = tangle.check_save(meta.get("commitment", None), wallet)
+
+        self.replay(tangle, wallet, meta.get("wal_seq", 0))
+
+        return tangle
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS msgs (
+    hash TEXT PRIMARY KEY,
+    node_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    receiver TEXT,
+    data TEXT NOT NULL,
+    invalid_parents TEXT NOT NULL,
+    pruned INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS msgs_issuer ON msgs (node_id, idx);
+CREATE INDEX IF NOT EXISTS msgs_receiver ON msgs (receiver);
+CREATE INDEX IF NOT EXISTS msgs_timestamp ON msgs (timestamp);
+
+CREATE TABLE IF NOT EXISTS parents (
+    child TEXT NOT NULL,
+    parent TEXT NOT NULL,
+    strong INTEGER NOT NULL,
+    PRIMARY KEY (child, parent)
+);
+CREATE INDEX IF NOT EXISTS parents_parent ON parents (parent);
+
+CREATE TABLE IF NOT EXISTS tips (
+    hash TEXT PRIMARY KEY,
+    weak INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS branches (
+    node_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (node_id, idx)
+);
+
+CREATE TABLE IF NOT EXISTS balances (
+    address TEXT PRIMARY KEY,
+    balance INTEGER NOT NULL,
+    pruned_msgs INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SqliteBackend(StorageBackend):
+    """
+    Stores the messages, tips, branches and balances in a sqlite database
+
+    Changes are written as they happen and committed in batches along with
+    the signed commitment of the tangle, which the rows match as changes
+    are only logged once they were made. Pruned messages stay in the
+    database so they can still be looked up without being loaded into the
+    tangle.
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: str = None,
+        *,
+        batch_size: int = wal_batch_size,
+        sync_interval: float = wal_sync_interval,
+    ):
+        if path is None:
+            if not os.path.exists(storage_path):
+                os.mkdir(storage_path)
+
+            path = f"{storage_path}/{DATABASE_PATH}.db"
+
+        self.path = path
+
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+
+        # Connection threads log events too
+        self.lock = RLock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+        self.tangle: "Tangle | None" = None
+
+        # Wallet that the commitment is signed with on every commit
+        self.wallet: Wallet | None = None
+
+        # Whether the pruned history changed since the last commit
+        self.snapshot_changed = False
+
+        # Top level branch managers that changed since the last commit
+        self.changed_branches: set[tuple[str, int]] = set()
+
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def attach(self, tangle: "Tangle"):
+        with self.lock:
+            # Storing the messages that the tangle had before it was attached
+            if self.tangle is not tangle:
+                self.insert_msgs(
+                    [m.to_dict() for m in tangle.all_msgs.values()]
+                )
+
+            self.tangle = tangle
+
+    def insert_msgs(self, msgs: list[dict], invalid_parents: list[str] = []):
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO msgs VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+            [
+                (
+                    m["hash"],
+                    m["node_id"],
+                    m["index"],
+                    m["timestamp"],
+                    m["payload"].get("receiver", None),
+                    json.dumps(m, separators=(",", ":")),
+                    json.dumps(invalid_parents),
+                )
+                for m in msgs
+            ],
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO parents VALUES (?, ?, ?)",
+            [(m["hash"], p, t) for m in msgs for p, t in m["parents"].items()],
+        )
+
+    def delete_msgs(self, hashes: list[str]):
+        rows = [(h,) for h in hashes]
+
+        self.conn.executemany(
+            "DELETE FROM msgs WHERE hash = ? AND pruned = 0", rows
+        )
+        self.conn.executemany("DELETE FROM parents WHERE child = ?", rows)
+
+    def log_event(self, event_type: str, **data):
+        with self.lock:
+            if event_type == "add_msg":
+                self.insert_msgs([data["msg"]], data["invalid_parents"])
+
+            elif event_type == "remove_msg":
+                self.delete_msgs([data["hash"]])
+
+            elif event_type == "swap":
+                self.delete_msgs([m["hash"] for m in data["old"]])
+                self.insert_msgs(data["new"])
+
+            elif event_type == "prune":
+                self.conn.executemany(
+                    "UPDATE msgs SET pruned = 1 WHERE hash = ?",
+                    [(h,) for h in data["hashes"]],
+                )
+                self.snapshot_changed = True
+
+            elif event_type in BRANCH_EVENTS:
+                nesting = data["nesting"]
+
+                # Rows are kept for the managers at the top of the nesting
+                self.changed_branches.add(
+                    tuple(nesting[0][0] if nesting else data["manager"])
+                )
+
+            self.pending += 1
+
+            if (
+                self.pending >= self.batch_size
+                or time.monotonic() - self.last_sync >= self.sync_interval
+            ):
+                self.commit()
+
+    def write_branches(self, branches: list[dict]):
+        self.conn.execute("DELETE FROM branches")
+        self.conn.executemany(
+            "INSERT INTO branches VALUES (?, ?, ?)",
+            [(b["node_id"], b["index"], json.dumps(b)) for b in branches],
+        )
+
+        self.changed_branches.clear()
+
+    def write_changed_branches(self):
+        """Only rewrites the rows of the branch managers that changed"""
+
+        for branch_id in self.changed_branches:
+            self.conn.execute(
+                "DELETE FROM branches WHERE node_id = ? AND idx = ?",
+                branch_id,
+            )
+
+            manager = self.tangle.branches.get(branch_id, None)
+
+            if manager is not None:
+                self.conn.execute(
+                    "INSERT INTO branches VALUES (?, ?, ?)",
+                    (*branch_id, json.dumps(manager.to_dict())),
+                )
+
+        self.changed_branches.clear()
+
+    def write_snapshot(self):
+        snapshot = self.tangle.snapshot
+
+        self.conn.execute("DELETE FROM balances")
+        self.conn.executemany(
+            "INSERT INTO balances VALUES (?, ?, ?)",
+            [
+                (a, snapshot.state.get_balance(a), snapshot.get_count(a))
+                for a in snapshot.state.wallets.keys() | snapshot.counts.keys()
+            ],
+        )
+
+        self.set_meta("snapshot_timestamp", snapshot.timestamp)
+        self.set_meta("snapshot_frontier", list(snapshot.frontier))
+
+        self.snapshot_changed = False
+
+    def write_tips(self):
+        self.conn.execute("DELETE FROM tips")
+        self.conn.executemany(
+            "INSERT INTO tips VALUES (?, ?)",
+            [(h, h in self.tangle.weak_tips) for h in self.tangle.all_tips],
+        )
+
+    def set_meta(self, key: str, value):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+            (key, json.dumps(value)),
+        )
+
+    def get_meta(self, key: str, default=None):
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+
+        return default if row is None else json.loads(row[0])
+
+    def write_commitment(self):
+        """Signs the commitment of the tangle that the rows now match"""
+
+        if self.wallet is not None:
+            self.tangle.add_hash()
+            self.tangle.sign(self.wallet)
+
+        self.set_meta("commitment", self.tangle.commitment.to_dict())
+        self.set_meta("signature", self.tangle.signature)
+
+    def commit(self):
+        with self.lock:
+            if self.tangle is not None:
+                # Only the tips at the time of the commit are kept
+                self.write_tips()
+
+                if self.snapshot_changed:
+                    self.write_snapshot()
+
+                if self.changed_branches:
+                    self.write_changed_branches()
+
+                self.write_commitment()
+
+            self.conn.commit()
+
+            self.pending = 0
+            self.last_sync = time.monotonic()
+
+    def save(self, tangle: "Tangle", wallet: Wallet):
+        with self.lock:
+            # Messages are already written as they are added to the tangle
+            self.attach(tangle)
+
+            self.wallet = wallet
+
+            self.write_branches(tangle.get_branches_as_dict())
+            self.write_snapshot()
+
+            self.commit()
+
+    def checkpoint(self, tangle: "Tangle", wallet: Wallet) -> int:
+        # Changes are written as they happen so they only have to be
+        # committed along with a new signature over the tangle
+        with tangle.lock, self.lock:
+            self.tangle = tangle
+            self.wallet = wallet
+
+            self.commit()
+
+        return os.path.getsize(self.path)
+
+    def load(self, wallet: Wallet) -> "Tangle":
+        from .snapshot import Snapshot
+        from .tangle import BranchManager, Tangle, TangleState
+
+        with self.lock:
+            self.wallet = wallet
+
+            signature = self.get_meta("signature", None)
+            commitment = self.get_meta("commitment", None)
+
+            # Falling back to the json save when nothing was committed yet
+            if signature is None and commitment is None:
+                return JsonBackend().load(wallet)
+
+            balances = self.conn.execute("SELECT * FROM balances").fetchall()
+
+            snapshot = Snapshot(
+                state=TangleState({a: b for a, b, _ in balances if b}),
+                timestamp=self.get_meta("snapshot_timestamp", 0),
+                counts={a: c for a, _, c in balances if c},
+                frontier=set(self.get_meta("snapshot_frontier", [])),
+            )
+
+            tips = dict(self.conn.execute("SELECT hash, weak FROM tips"))
+
+            # Only loading the messages that weren't pruned
+            rows = self.conn.execute(
+                "SELECT data FROM msgs WHERE pruned = 0 ORDER BY rowid"
+            )
+
+            msgs, strong_tips, weak_tips = {}, {}, {}
+
+            # The balances are the pruned ones along with every message's
+            state = TangleState(dict(snapshot.state.wallets))
+
+            for (data,) in rows:
+                msg = message_lookup(json.loads(data))
+
+                if msg is None:
+                    continue
+
+                if msg.hash not in tips:
+                    msgs[msg.hash] = msg
+                elif tips[msg.hash]:
+                    weak_tips[msg.hash] = msg
+                else:
+                    strong_tips[msg.hash] = msg
+
+                msg.update_state(state)
+
+            branches = [
+                BranchManager.from_dict(json.loads(data))
+                for (data,) in self.conn.execute("SELECT data FROM branches")
+            ]
+
+            tangle = Tangle(
+                msgs=msgs,
+                strong_tips=strong_tips,
+                weak_tips=weak_tips,
+                branches={m.id: m for m in branches},
+                state=state,
+                snapshot=snapshot,
+                signature=signature,
+            )
+
+            self.tangle = tangle
+
+        # Only dropping the ranges of messages that were tampered
+        return tangle.check_save(commitment, wallet)
+
+    def get_msg(self, msg_hash: str) -> Message | None:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT data FROM msgs WHERE hash = ?", (msg_hash,)
+            ).fetchone()
+
+        return None if row is None else message_lookup(json.loads(row[0]))
+
+    def is_pruned(self, msg_hash: str) -> bool:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM msgs WHERE hash = ? AND pruned = 1", (msg_hash,)
+            ).fetchone()
+
+        return row is not None
+
+    def get_address_history(self, address: str, limit: int = None):
+        with self.lock:
+            # Using the issuer and receiver indexes separately
+            rows = self.conn.execute(
+                "SELECT data, timestamp, idx FROM msgs WHERE node_id = ? "
+                "UNION ALL "
+                "SELECT data, timestamp, idx FROM msgs "
+                "WHERE receiver = ? AND node_id != ? "
+                "ORDER BY timestamp DESC, idx DESC LIMIT ?",
+                (address, address, address, -1 if limit is None else limit),
+            ).fetchall()
+
+        return [message_lookup(json.loads(data)) for data, *_ in rows]
+
+    def sync(self):
+        self.commit()
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+
+storage_backends = {
+    b.name: b for b in (JsonBackend, BinaryBackend, SqliteBackend)
+}
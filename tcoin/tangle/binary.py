@@ -0,0 +1,322 @@
+"""
+Versioned binary snapshot of the tangle that is loaded with mmap
+
+Layout (little endian):
+
+    header -- magic, version and the (offset, length) of every section
+    strings -- offsets followed by the utf-8 data of every unique string
+    msgs -- fixed-width message records that reference the string table
+    parents -- fixed-width (hash, strong) records of the message parents
+    balances -- (address, balance) records of the tangle state
+    snapshot -- (address, balance, pruned messages) of the pruned history
+    frontier -- hashes of the pruned messages still approved by others
+    meta -- json of the fields without a fixed width (branches, etc.)
+"""
+
+import json
+import mmap
+import struct
+from typing import TYPE_CHECKING
+
+from tcoin.utils import atomic_write, intern_str
+
+from .messages import Message, message_types
+from .store import MsgStatus
+
+if TYPE_CHECKING:
+    from .tangle import Tangle
+
+MAGIC = b"TCSN"
+VERSION = 1
+
+SECTIONS = (
+    "strings",
+    "msgs",
+    "parents",
+    "balances",
+    "snapshot",
+    "frontier",
+    "meta",
+)
+
+HEADER = struct.Struct(f"<4sH{len(SECTIONS) * 2}Q")
+
+# hash, node id, value, signature, receiver, payload, amt, timestamp, index,
+# nonce, first parent, amount of parents, status
+MSG_RECORD = struct.Struct("<IIIiiiqqqQIBB")
+PARENT_RECORD = struct.Struct("<IB")
+BALANCE_RECORD = struct.Struct("<Iq")
+SNAPSHOT_RECORD = struct.Struct("<Iqq")
+STRING_OFFSET = struct.Struct("<I")
+
+STATUS_CODES = {s: i for i, s in enumerate(MsgStatus)}
+STATUSES = list(MsgStatus)
+
+INT64_RANGE = range(-(2**63), 2**63)
+
+
+class StringTable:
+    def __init__(self):
+        self.ids: dict[str, int] = {}
+        self.strings: list[str] = []
+
+    def get_id(self, value: str | None) -> int:
+        if value is None:
+            return -1
+
+        _id = self.ids.get(value, None)
+
+        if _id is None:
+            _id = len(self.strings)
+
+            self.ids[value] = _id
+            self.strings.append(value)
+
+        return _id
+
+    def to_bytes(self) -> bytes:
+        data = [s.encode() for s in self.strings]
+
+        offsets, total = [], 0
+
+        for d in data:
+            offsets.append(total)
+            total += len(d)
+
+        offsets.append(total)
+
+        header = struct.pack(f"<I{len(offsets)}I", len(data), *offsets)
+
+        return header + b"".join(data)
+
+
+def read_strings(view: memoryview) -> list[str]:
+    (count,) = STRING_OFFSET.unpack_from(view, 0)
+
+    offsets = struct.unpack_from(f"<{count + 1}I", view, STRING_OFFSET.size)
+
+    start = STRING_OFFSET.size * (count + 2)
+    data = view[start:]
+
+    return [
+        intern_str(str(data[offsets[i] : offsets[i + 1]], "utf-8"))
+        for i in range(count)
+    ]
+
+
+def is_transaction_payload(payload: dict) -> bool:
+    """Whether the payload fits in the fixed-width transaction fields"""
+
+    return (
+        list(payload) == ["receiver", "amt"]
+        and type(payload["receiver"]) is str
+        and type(payload["amt"]) is int
+        and payload["amt"] in INT64_RANGE
+    )
+
+
+def dump_tangle(tangle: "Tangle", meta: dict = None) -> bytes:
+    if meta is None:
+        meta = {}
+
+    strings = StringTable()
+
+    msgs, parents = [], []
+
+    for msg_hash, status in tangle.store.status.items():
+        msg = tangle.store.get(msg_hash)
+
+        if is_transaction_payload(msg.payload):
+            receiver = strings.get_id(msg.payload["receiver"])
+            amt = msg.payload["amt"]
+            payload = -1
+
+        else:
+            receiver, amt = -1, 0
+            payload = strings.get_id(json.dumps(msg.payload))
+
+        msgs.append(
+            MSG_RECORD.pack(
+                strings.get_id(msg.hash),
+                strings.get_id(msg.node_id),
+                strings.get_id(msg.value),
+                strings.get_id(msg.signature),
+                receiver,
+                payload,
+                amt,
+                msg.timestamp,
+                msg.index,
+                msg.nonce,
+                len(parents),
+                len(msg.parent_hashes),
+                STATUS_CODES[status],
+            )
+        )
+
+        for p, t in zip(msg.parent_hashes, msg.parent_types):
+            parents.append(PARENT_RECORD.pack(strings.get_id(p), t))
+
+    balances = [
+        BALANCE_RECORD.pack(strings.get_id(a), b)
+        for a, b in tangle.state.wallets.items()
+    ]
+
+    snapshot = tangle.snapshot
+
+    snapshot_records = [
+        SNAPSHOT_RECORD.pack(
+            strings.get_id(a),
+            snapshot.state.get_balance(a),
+            snapshot.get_count(a),
+        )
+        for a in snapshot.state.wallets.keys() | snapshot.counts.keys()
+    ]
+
+    frontier = [
+        STRING_OFFSET.pack(strings.get_id(h)) for h in snapshot.frontier
+    ]
+
+    meta = {
+        **meta,
+        "signature": tangle.signature,
+        "snapshot_timestamp": snapshot.timestamp,
+        "invalid_msg_pool": tangle.state.invalid_msg_pool.to_dict(),
+        "branches": tangle.get_branches_as_dict(),
+        "commitment": tangle.commitment.to_dict(),
+    }
+
+    sections = [
+        strings.to_bytes(),
+        b"".join(msgs),
+        b"".join(parents),
+        b"".join(balances),
+        b"".join(snapshot_records),
+        b"".join(frontier),
+        json.dumps(meta).encode(),
+    ]
+
+    # Finding where each section starts after the header
+    positions, offset = [], HEADER.size
+
+    for s in sections:
+        positions += [offset, len(s)]
+        offset += len(s)
+
+    return HEADER.pack(MAGIC, VERSION, *positions) + b"".join(sections)
+
+
+def load_tangle(data) -> tuple["Tangle", dict]:
+    """Restores a tangle from a binary snapshot without replaying it"""
+
+    from .snapshot import Snapshot
+    from .tangle import BranchManager, Tangle, TangleState
+
+    view = memoryview(data)
+
+    magic, version, *positions = HEADER.unpack_from(view, 0)
+
+    if magic != MAGIC:
+        raise ValueError("Not a tangle snapshot")
+
+    if version != VERSION:
+        raise ValueError(f"Unsupported tangle snapshot version {version}")
+
+    sections = {
+        name: view[positions[i * 2] : positions[i * 2] + positions[i * 2 + 1]]
+        for i, name in enumerate(SECTIONS)
+    }
+
+    strings = read_strings(sections["strings"])
+
+    parents = [
+        (strings[h], bool(t))
+        for h, t in PARENT_RECORD.iter_unpack(sections["parents"])
+    ]
+
+    msg_classes = {c.value: c for c in message_types}
+
+    pools = {s: {} for s in MsgStatus}
+
+    for (
+        h,
+        node_id,
+        value,
+        signature,
+        receiver,
+        payload,
+        amt,
+        timestamp,
+        index,
+        nonce,
+        start,
+        count,
+        status,
+    ) in MSG_RECORD.iter_unpack(sections["msgs"]):
+        if payload == -1:
+            payload = {"receiver": strings[receiver], "amt": amt}
+        else:
+            payload = json.loads(strings[payload])
+
+        msg: Message = msg_classes[strings[value]](
+            node_id=strings[node_id],
+            index=index,
+            payload=payload,
+            parents=dict(parents[start : start + count]),
+            nonce=nonce,
+            timestamp=timestamp,
+            hash=strings[h],
+            signature=None if signature == -1 else strings[signature],
+        )
+
+        pools[STATUSES[status]][msg.hash] = msg
+
+    meta = json.loads(str(sections["meta"], "utf-8"))
+
+    state = TangleState(
+        {
+            strings[a]: b
+            for a, b in BALANCE_RECORD.iter_unpack(sections["balances"])
+        },
+        meta["invalid_msg_pool"],
+    )
+
+    snapshot_records = list(SNAPSHOT_RECORD.iter_unpack(sections["snapshot"]))
+
+    snapshot = Snapshot(
+        state=TangleState(
+            {strings[a]: b for a, b, _ in snapshot_records if b}
+        ),
+        timestamp=meta["snapshot_timestamp"],
+        counts={strings[a]: c for a, _, c in snapshot_records if c},
+        frontier={
+            strings[h]
+            for (h,) in STRING_OFFSET.iter_unpack(sections["frontier"])
+        },
+    )
+
+    branches = [BranchManager.from_dict(b) for b in meta["branches"]]
+
+    # Building the store and indexes directly from the saved statuses
+    tangle = Tangle(
+        msgs=pools[MsgStatus.APPROVED],
+        strong_tips=pools[MsgStatus.STRONG_TIP],
+        weak_tips=pools[MsgStatus.WEAK_TIP],
+        branches={m.id: m for m in branches},
+        state=state,
+        snapshot=snapshot,
+        signature=meta["signature"],
+    )
+
+    return tangle, meta
+
+
+def save_binary(path: str, tangle: "Tangle", meta: dict = None) -> int:
+    return atomic_write(path, dump_tangle(tangle, meta))
+
+
+def load_binary(path: str) -> tuple["Tangle", dict]:
+    with open(path, "rb") as f:
+        # The map is closed once the views of it are garbage collected
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    return load_tangle(mm)
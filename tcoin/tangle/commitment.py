@@ -0,0 +1,492 @@
+"""
+Incremental commitment over the messages, balances and branches of the tangle
+
+Leaves are spread over a fixed amount of buckets by the crc32 of their key
+and every bucket keeps its leaf hashes in a merkle treap. The shape of a
+treap only depends on the leaves it holds, so the same leaves give the same
+bucket hash no matter the order they were added and removed in, and a
+change only creates the O(log n) nodes on its path. A merkle tree over the
+buckets gives the root and only the new nodes and the paths of the changed
+buckets are hashed again when it is read.
+
+Branches are rarely more than a few conflicting messages, so they are
+hashed as a whole whenever the tangle is signed.
+
+Comparing the buckets with the ones of a save finds the ranges of keys that
+were corrupted instead of only knowing that something changed.
+"""
+
+import hashlib
+import json
+import zlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .messages import Message
+
+DEPTH = 8  # the tree has 2**DEPTH buckets
+
+# Saves without a version summed the leaves of their buckets and version 1
+# hashed the sorted leaves of a bucket without committing to the branches
+VERSION = 2
+
+
+def hash_leaf(data: str) -> bytes:
+    return hashlib.sha256(data.encode()).digest()
+
+
+def hash_msg(msg: "Message") -> bytes:
+    # Statuses are left out as they are derived from the parents
+    return hash_leaf(
+        f"msg:{msg.hash}:{msg.node_id}:{msg.value}:{msg.payload}:"
+        f"{msg.timestamp}:{msg.parent_hashes}:{msg.parent_types}:"
+        f"{msg.index}:{msg.nonce}:{msg.signature}"
+    )
+
+
+def hash_balance(address: str, balance: int) -> bytes:
+    return hash_leaf(f"balance:{address}:{balance}")
+
+
+def hash_pair(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(left + right).digest()
+
+
+def hash_json(data) -> bytes:
+    return hash_leaf(json.dumps(data, sort_keys=True, separators=(",", ":")))
+
+
+def hash_branch(data: dict) -> bytes:
+    # Sorting the messages and sub-branches as they are kept in dicts
+    return hash_json(
+        [
+            data["founder"],
+            sorted(hash_json(m).hex() for m in data["msgs"]),
+            sorted(hash_manager(b).hex() for b in data["branches"]),
+        ]
+    )
+
+
+def hash_manager(data: dict) -> bytes:
+    return hash_json(
+        [
+            data["node_id"],
+            data["index"],
+            data["nesting"],
+            hash_branch(data["main_branch"]).hex(),
+            sorted(hash_branch(c).hex() for c in data["conflicts"]),
+        ]
+    )
+
+
+def hash_branches(branches: list[dict]) -> bytes:
+    return hash_json(sorted(hash_manager(m).hex() for m in branches))
+
+
+EMPTY = hashlib.sha256(b"").digest()
+
+
+class TreapNode:
+    """
+    Immutable node of a merkle treap ordered by the leaves, where a leaf
+    with a higher priority is always above the lower ones
+    """
+
+    __slots__ = ("leaf", "priority", "left", "right", "_hash")
+
+    def __init__(
+        self,
+        leaf: bytes,
+        left: "TreapNode | None" = None,
+        right: "TreapNode | None" = None,
+    ):
+        self.leaf = leaf
+        self.left = left
+        self.right = right
+
+        # Leaves are hashes so their reversed bytes are as good as random
+        self.priority = leaf[::-1]
+
+        # Hashed when the bucket is read as nodes are never changed
+        self._hash: bytes | None = None
+
+    @property
+    def hash(self) -> bytes:
+        if self._hash is None:
+            self._hash = hashlib.sha256(
+                (b"" if self.left is None else self.left.hash)
+                + self.leaf
+                + (b"" if self.right is None else self.right.hash)
+            ).digest()
+
+        return self._hash
+
+
+def treap_split(
+    node: TreapNode | None, leaf: bytes
+) -> tuple[TreapNode | None, TreapNode | None]:
+    """Splits a treap into the leaves before and after a missing leaf"""
+
+    if node is None:
+        return None, None
+
+    if node.leaf < leaf:
+        left, right = treap_split(node.right, leaf)
+
+        return TreapNode(node.leaf, node.left, left), right
+
+    left, right = treap_split(node.left, leaf)
+
+    return left, TreapNode(node.leaf, right, node.right)
+
+
+def treap_merge(
+    left: TreapNode | None, right: TreapNode | None
+) -> TreapNode | None:
+    """Merges two treaps where every leaf of the left one comes first"""
+
+    if left is None:
+        return right
+
+    if right is None:
+        return left
+
+    if left.priority > right.priority:
+        return TreapNode(left.leaf, left.left, treap_merge(left.right, right))
+
+    return TreapNode(right.leaf, treap_merge(left, right.left), right.right)
+
+
+def treap_insert(node: TreapNode | None, leaf: bytes) -> TreapNode:
+    if node is None:
+        return TreapNode(leaf)
+
+    if node.leaf == leaf:
+        return node
+
+    new = TreapNode(leaf)
+
+    if new.priority > node.priority:
+        new.left, new.right = treap_split(node, leaf)
+
+        return new
+
+    if leaf < node.leaf:
+        return TreapNode(node.leaf, treap_insert(node.left, leaf), node.right)
+
+    return TreapNode(node.leaf, node.left, treap_insert(node.right, leaf))
+
+
+def treap_build(leaves: list[bytes]) -> TreapNode | None:
+    """Builds a treap from sorted leaves in linear time"""
+
+    # Right spine of the treap built so far
+    stack: list[TreapNode] = []
+
+    for leaf in leaves:
+        node = TreapNode(leaf)
+
+        while stack and stack[-1].priority < node.priority:
+            node.left = stack.pop()
+
+        if stack:
+            stack[-1].right = node
+
+        stack.append(node)
+
+    return stack[0] if stack else None
+
+
+def treap_leaves(node: TreapNode | None) -> list[bytes]:
+    """Sorted leaves of a treap"""
+
+    leaves = []
+    stack = []
+
+    while stack or node is not None:
+        if node is not None:
+            stack.append(node)
+            node = node.left
+        else:
+            node = stack.pop()
+            leaves.append(node.leaf)
+            node = node.right
+
+    return leaves
+
+
+def treap_remove(node: TreapNode | None, leaf: bytes) -> TreapNode | None:
+    if node is None:
+        return None
+
+    if node.leaf == leaf:
+        return treap_merge(node.left, node.right)
+
+    if leaf < node.leaf:
+        left = treap_remove(node.left, leaf)
+
+        # Keeping the node when the leaf wasn't found
+        if left is node.left:
+            return node
+
+        return TreapNode(node.leaf, left, node.right)
+
+    right = treap_remove(node.right, leaf)
+
+    if right is node.right:
+        return node
+
+    return TreapNode(node.leaf, node.left, right)
+
+
+class MerkleBuckets:
+    """Merkle tree over buckets that each hold a treap of their leaves"""
+
+    def __init__(self, depth: int = DEPTH):
+        self.depth = depth
+        self.size = 1 << depth
+
+        # bucket: treap of the leaf hashes
+        self.treaps: list[TreapNode | None] = [None] * self.size
+        self.sizes: list[int] = [0] * self.size
+
+        # bucket: leaves added since the root was last computed, which
+        # are inserted together as loading adds most of the leaves at once
+        self.pending: list[set[bytes]] = [set() for _ in range(self.size)]
+
+        # Heap layout where node 1 is the root and the buckets start at size
+        self.nodes: list[bytes] = [b""] * (self.size * 2)
+
+        # Buckets that changed since the root was last computed
+        self.dirty: set[int] = set(range(self.size))
+
+    def get_bucket(self, key: str) -> int:
+        return zlib.crc32(key.encode()) >> (32 - self.depth)
+
+    def get_range(self, bucket: int) -> tuple[int, int]:
+        """Range of crc32 values of the keys in a bucket"""
+
+        width = 1 << (32 - self.depth)
+
+        return bucket * width, (bucket + 1) * width
+
+    def add(self, key: str, leaf: bytes):
+        i = self.get_bucket(key)
+
+        self.pending[i].add(leaf)
+        self.dirty.add(i)
+
+    def remove(self, key: str, leaf: bytes):
+        i = self.get_bucket(key)
+
+        if leaf in self.pending[i]:
+            self.pending[i].remove(leaf)
+            return
+
+        treap = treap_remove(self.treaps[i], leaf)
+
+        if treap is not self.treaps[i]:
+            self.treaps[i] = treap
+            self.sizes[i] -= 1
+            self.dirty.add(i)
+
+    def insert_pending(self, i: int):
+        pending = self.pending[i]
+
+        if not pending:
+            return
+
+        # Rebuilding the bucket when it costs less than inserting each leaf
+        if len(pending) * 16 >= self.sizes[i]:
+            leaves = pending.union(treap_leaves(self.treaps[i]))
+
+            self.treaps[i] = treap_build(sorted(leaves))
+            self.sizes[i] = len(leaves)
+
+        else:
+            for leaf in pending:
+                self.treaps[i] = treap_insert(self.treaps[i], leaf)
+
+            self.sizes[i] += len(pending)
+
+        pending.clear()
+
+    def update(self):
+        """Hashes the paths from the changed buckets up to the root"""
+
+        if not self.dirty:
+            return
+
+        level = set()
+
+        for i in self.dirty:
+            self.insert_pending(i)
+
+            treap = self.treaps[i]
+
+            self.nodes[self.size + i] = EMPTY if treap is None else treap.hash
+
+            level.add((self.size + i) >> 1)
+
+        # Every node of a level is hashed before moving up to the next
+        while level:
+            for n in level:
+                self.nodes[n] = hash_pair(
+                    self.nodes[n * 2], self.nodes[n * 2 + 1]
+                )
+
+            level = {n >> 1 for n in level if n > 1}
+
+        self.dirty.clear()
+
+    @property
+    def root(self) -> bytes:
+        self.update()
+
+        return self.nodes[1]
+
+    def get_buckets(self) -> list[str]:
+        self.update()
+
+        return [n.hex() for n in self.nodes[self.size :]]
+
+    @staticmethod
+    def compute_root(buckets: list[bytes]) -> bytes:
+        level = buckets
+
+        while len(level) > 1:
+            level = [
+                hash_pair(level[i], level[i + 1])
+                for i in range(0, len(level), 2)
+            ]
+
+        return level[0]
+
+    def copy(self) -> "MerkleBuckets":
+        buckets = MerkleBuckets(self.depth)
+
+        # Treaps are immutable so they are shared with the copy
+        buckets.treaps = list(self.treaps)
+        buckets.sizes = list(self.sizes)
+        buckets.pending = [set(p) for p in self.pending]
+        buckets.nodes = list(self.nodes)
+        buckets.dirty = set(self.dirty)
+
+        return buckets
+
+    def find_mismatches(self, buckets: list[str]) -> list[int]:
+        return [
+            i
+            for i, (a, b) in enumerate(zip(self.get_buckets(), buckets))
+            if a != b
+        ]
+
+
+class Commitment:
+    """
+    Commits to the messages of the tangle, the balances of its state and
+    its branches
+    """
+
+    def __init__(self, depth: int = DEPTH):
+        self.depth = depth
+
+        self.msgs = MerkleBuckets(depth)
+        self.balances = MerkleBuckets(depth)
+
+        self.branches = hash_branches([])
+
+    def add_msg(self, msg: "Message"):
+        self.msgs.add(msg.hash, hash_msg(msg))
+
+    def remove_msg(self, msg: "Message"):
+        self.msgs.remove(msg.hash, hash_msg(msg))
+
+    def update_balance(self, address: str, old: int, new: int):
+        if old == new:
+            return
+
+        # Empty balances have no leaf so that they match missing wallets
+        if old:
+            self.balances.remove(address, hash_balance(address, old))
+
+        if new:
+            self.balances.add(address, hash_balance(address, new))
+
+    def set_branches(self, branches: list[dict]):
+        self.branches = hash_branches(branches)
+
+    def copy(self) -> "Commitment":
+        commitment = Commitment(self.depth)
+
+        commitment.msgs = self.msgs.copy()
+        commitment.balances = self.balances.copy()
+        commitment.branches = self.branches
+
+        return commitment
+
+    @staticmethod
+    def compute_root(msgs: bytes, balances: bytes, branches: bytes) -> str:
+        return hash_pair(hash_pair(msgs, balances), branches).hex()
+
+    @property
+    def root(self) -> str:
+        return self.compute_root(
+            self.msgs.root, self.balances.root, self.branches
+        )
+
+    def get_msg_bucket(self, msg_hash: str) -> int:
+        return self.msgs.get_bucket(msg_hash)
+
+    def to_dict(self) -> dict:
+        return {
+            "version": VERSION,
+            "root": self.root,
+            "msgs": self.msgs.get_buckets(),
+            "balances": self.balances.get_buckets(),
+            "branches": self.branches.hex(),
+        }
+
+    def is_valid_dict(self, data: dict) -> bool:
+        """Checks if saved buckets are well formed and add up to their root"""
+
+        try:
+            if data["version"] != VERSION:
+                return False
+
+            msgs, balances = (
+                [bytes.fromhex(b) for b in data[k]]
+                for k in ("msgs", "balances")
+            )
+
+            if not len(msgs) == len(balances) == 1 << self.depth:
+                return False
+
+            root = self.compute_root(
+                MerkleBuckets.compute_root(msgs),
+                MerkleBuckets.compute_root(balances),
+                bytes.fromhex(data["branches"]),
+            )
+
+            return root == data["root"]
+
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def find_corrupted(self, data: dict) -> tuple[list[int], bool, bool]:
+        """
+        Compares the commitment with a saved one, returning the message
+        buckets that don't match and whether the balances and the branches
+        match
+        """
+
+        if self.root == data["root"]:
+            return [], True, True
+
+        balances = [bytes.fromhex(b) for b in data["balances"]]
+
+        return (
+            self.msgs.find_mismatches(data["msgs"]),
+            self.balances.root == MerkleBuckets.compute_root(balances),
+            self.branches.hex() == data["branches"],
+        )
@@ -0,0 +1,74 @@
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import TYPE_CHECKING
+
+from tcoin.constants import BASE_DIFFICULTY, GAMMA, TIME_WINDOW
+
+if TYPE_CHECKING:
+    from .messages import Message
+
+
+class DifficultyEngine:
+    """Keeps a sorted window of message timestamps for each issuer"""
+
+    def __init__(self, window: int = TIME_WINDOW):
+        self.window = window
+
+        self.timestamps: dict[str, list[int]] = {}  # address: timestamps
+
+    def add(self, msg: "Message"):
+        timestamps = self.timestamps.setdefault(msg.address, [])
+
+        # Messages mostly arrive in order so this is usually an append
+        if not timestamps or timestamps[-1] <= msg.timestamp:
+            timestamps.append(msg.timestamp)
+        else:
+            insort(timestamps, msg.timestamp)
+
+    def remove(self, msg: "Message"):
+        timestamps = self.timestamps.get(msg.address, None)
+
+        if timestamps is None:
+            return
+
+        i = bisect_left(timestamps, msg.timestamp)
+
+        if i < len(timestamps) and timestamps[i] == msg.timestamp:
+            del timestamps[i]
+
+        if not timestamps:
+            del self.timestamps[msg.address]
+
+    def count_in_window(self, address: str, timestamp: int) -> int:
+        """Amount of messages strictly inside the window before a timestamp"""
+
+        timestamps = self.timestamps.get(address, None)
+
+        if timestamps is None:
+            return 0
+
+        start = bisect_right(timestamps, timestamp - self.window)
+        end = bisect_left(timestamps, timestamp)
+
+        return max(end - start, 0)
+
+    def get_difficulty(self, address: str, timestamp: int) -> int:
+        msg_count = self.count_in_window(address, timestamp)
+
+        return BASE_DIFFICULTY + int(GAMMA * msg_count)
+
+    def get_rate(self, address: str, timestamp: int = None) -> float:
+        """Messages per second issued by an address in the current window"""
+
+        if timestamp is None:
+            timestamp = int(time.time()) + 1
+
+        return self.count_in_window(address, timestamp) / self.window
+
+    def get_rates(self, timestamp: int = None) -> dict[str, float]:
+        rates = {
+            address: self.get_rate(address, timestamp)
+            for address in self.timestamps
+        }
+
+        return {address: r for address, r in rates.items() if r}
@@ -0,0 +1,139 @@
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from .messages import Message
+    from .tangle import Branch
+
+
+class ChildrenIndex:
+    """Maps the hash of a message to the hashes of the messages approving it"""
+
+    def __init__(self):
+        self.children: dict[str, set[str]] = {}  # parent hash: child hashes
+
+    def add(self, msg: "Message"):
+        for p in msg.parent_hashes:
+            self.children.setdefault(p, set()).add(msg.hash)
+
+    def remove(self, msg: "Message"):
+        for p in msg.parent_hashes:
+            children = self.children.get(p, None)
+
+            if children is None:
+                continue
+
+            children.discard(msg.hash)
+
+            if not children:
+                del self.children[p]
+
+    def get(self, msg_hash: str) -> set[str]:
+        return self.children.get(msg_hash, set())
+
+    def has_many_descendants(
+        self, msg_hash: str, exists: Callable[[str], bool]
+    ) -> bool:
+        """Checks if a message has more than one existing descendant"""
+
+        children = [c for c in self.get(msg_hash) if exists(c)]
+
+        if len(children) > 1:
+            return True
+
+        # A single child only counts twice if it has a child of its own
+        return any(exists(c) for _id in children for c in self.get(_id))
+
+    def find_descendants(
+        self,
+        msg_hash: str,
+        lookup: Callable[[str], "Message | None"],
+        *,
+        stop: Callable[[dict[str, "Message"]], bool] = None,
+    ) -> dict[str, "Message"]:
+        total = {}
+        to_visit = [msg_hash]
+
+        while to_visit:
+            current = to_visit.pop()
+
+            for _id in self.get(current):
+                if _id in total:
+                    continue
+
+                msg = lookup(_id)
+
+                if msg is None:
+                    continue
+
+                total[_id] = msg
+                to_visit.append(_id)
+
+            if stop is not None and stop(total):
+                break
+
+        return total
+
+
+class IssuerIndex:
+    """Keeps track of the messages issued by each address"""
+
+    def __init__(self):
+        self.counts: dict[str, int] = {}  # address: amount of messages
+
+        # address: {(node_id, index): hash}
+        self.ids: dict[str, dict[tuple[str, int], str]] = {}
+
+    def add(self, msg: "Message"):
+        self.counts[msg.address] = self.counts.get(msg.address, 0) + 1
+
+        ids = self.ids.setdefault(msg.address, {})
+
+        # Keeping the first message that was seen with the index
+        ids.setdefault(msg.id, msg.hash)
+
+    def remove(self, msg: "Message"):
+        count = self.counts.get(msg.address, 0) - 1
+
+        if count <= 0:
+            self.counts.pop(msg.address, None)
+            self.ids.pop(msg.address, None)
+            return
+
+        self.counts[msg.address] = count
+
+        ids = self.ids[msg.address]
+
+        if ids.get(msg.id, None) == msg.hash:
+            del ids[msg.id]
+
+    def get_count(self, address: str) -> int:
+        return self.counts.get(address, 0)
+
+    def find(self, msg_id: tuple[str, int]) -> str | None:
+        node_id, _ = msg_id
+
+        return self.ids.get(node_id, {}).get(msg_id, None)
+
+
+class BranchIndex:
+    """Maps the hash of a message to the branches that contain it"""
+
+    def __init__(self):
+        self.branches: dict[str, set["Branch"]] = {}  # hash: branches
+
+    def add(self, msg_hash: str, branch: "Branch"):
+        self.branches.setdefault(msg_hash, set()).add(branch)
+
+    def remove(self, msg_hash: str, branch: "Branch"):
+        branches = self.branches.get(msg_hash, None)
+
+        if branches is None:
+            return
+
+        branches.discard(branch)
+
+        if not branches:
+            del self.branches[msg_hash]
+
+    def get(self, msg_hash: str) -> set["Branch"]:
+        return self.branches.get(msg_hash, set())
@@ -0,0 +1,97 @@
+import time
+from collections import OrderedDict
+
+from tcoin.config import invalid_msg_pool_purge_time, invalid_msg_pool_size
+
+
+class InvalidMsgPool:
+    """
+    Least recently used pool of invalid message hashes
+
+    Entries are ordered by their last access so that both expired and
+    excess entries are always evicted from the front in amortized O(1).
+    """
+
+    def __init__(
+        self,
+        msgs: dict[str, int] = None,
+        *,
+        size: int = invalid_msg_pool_size,
+        purge_time: int = invalid_msg_pool_purge_time,
+    ):
+        if msgs is None:
+            msgs = {}
+
+        self.size = size
+        self.purge_time = purge_time
+
+        # hash: timestamp of last access
+        self.msgs: OrderedDict[str, int] = OrderedDict(
+            sorted(msgs.items(), key=lambda m: m[1])
+        )
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self.evict()
+
+    def __contains__(self, msg_hash: str) -> bool:
+        return msg_hash in self.msgs
+
+    def __len__(self) -> int:
+        return len(self.msgs)
+
+    def add(self, msg_hash: str):
+        self.msgs[msg_hash] = int(time.time())
+        self.msgs.move_to_end(msg_hash)
+
+        self.evict()
+
+    def check(self, msg_hash: str) -> bool:
+        """Checks if a message is in the pool and updates its access time"""
+
+        self.purge_expired()
+
+        if msg_hash not in self.msgs:
+            self.misses += 1
+            return False
+
+        self.hits += 1
+        self.add(msg_hash)
+
+        return True
+
+    def purge_expired(self):
+        expiry = time.time() - self.purge_time
+
+        # Purging invalid messages that haven't been accessed in a while
+        while self.msgs:
+            msg_hash, t = next(iter(self.msgs.items()))
+
+            if t >= expiry:
+                break
+
+            del self.msgs[msg_hash]
+            self.expirations += 1
+
+    def evict(self):
+        # Purging the least recently accessed invalid messages
+        while len(self.msgs) > self.size:
+            self.msgs.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self.msgs),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def to_dict(self) -> dict[str, int]:
+        return dict(self.msgs)
@@ -13,8 +13,9 @@ from tcoin.utils import (
     check_var_types,
     get_pow_hash,
     get_target,
+    intern_str,
     is_valid_hash,
-    pow,
+    solve_pow,
 )
 
 from ..signed import Signed
@@ -57,6 +58,8 @@ class SignedPayload(Signed):
     value: str -- Identifier of type of message
     """
 
+    __slots__ = ("node_id", "payload", "timestamp")
+
     value: str = ...
 
     def __init__(
@@ -108,6 +111,15 @@ class SignedPayload(Signed):
 
 
 class Message(SignedPayload):
+    """
+    Messages are kept compact in memory since the tangle holds many of them
+
+    Strings shared between messages (hashes, addresses and payload fields)
+    are interned and the parents are stored as two tuples.
+    """
+
+    __slots__ = ("parent_hashes", "parent_types", "index", "nonce")
+
     def __init__(
         self,
         *,
@@ -121,13 +133,13 @@ class Message(SignedPayload):
         signature: str = None
     ):
         if parents is None:
-            parents = []
+            parents = {}
 
         super().__init__(
-            node_id=node_id,
-            payload=payload,
+            node_id=intern_str(node_id),
+            payload={intern_str(k): intern_str(v) for k, v in payload.items()},
             timestamp=timestamp,
-            hash=hash,
+            hash=intern_str(hash),
             signature=signature,
         )
 
@@ -137,6 +149,17 @@ class Message(SignedPayload):
 
         self.nonce = nonce
 
+    @property
+    def parents(self) -> dict[str, bool]:
+        return dict(zip(self.parent_hashes, self.parent_types))
+
+    @parents.setter
+    def parents(self, parents: dict[str, bool]):
+        self.parent_hashes: tuple[str, ...] = tuple(
+            intern_str(p) for p in parents
+        )
+        self.parent_types: tuple[bool, ...] = tuple(parents.values())
+
     @property
     def id(self):
         return (self.node_id, self.index)
@@ -146,7 +169,7 @@ class Message(SignedPayload):
         # TODO: add a reputation system
         return 1
 
-    def update_state(self, state: "TangleState"):
+    def update_state(self, state: "TangleState", add: bool = True):
         """Updates the tangle state with a message"""
         ...
 
@@ -160,12 +183,13 @@ class Message(SignedPayload):
         raw_data = self.get_raw_data()
         difficulty = tangle.get_difficulty(self)
 
-        result = pow(raw_data, difficulty)
+        result = solve_pow(raw_data, difficulty)
 
         if result:
-            self.hash, self.nonce = result
+            hash_result, self.nonce = result
+            self.hash = intern_str(hash_result)
 
-    def is_sem_valid(self):
+    def is_sem_valid(self, *, check_signature: bool = True):
         """Checks if the message is semantically valid"""
 
         data = self.to_dict()
@@ -210,7 +234,7 @@ class Message(SignedPayload):
             return False
 
         # Checking if the signature is valid
-        if self.is_signature_valid is False:
+        if check_signature and self.is_signature_valid is False:
             return False
 
         # Checking if there are enough strong parents
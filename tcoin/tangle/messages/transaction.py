@@ -22,6 +22,8 @@ class TransactionPayload(Payload):
 
 
 class Transaction(Message):
+    __slots__ = ()
+
     value = "transaction"
 
     def get_transaction(self):
@@ -53,5 +55,5 @@ class Transaction(Message):
 
         return True
 
-    def update_state(self, state: "TangleState"):
-        state.update_tx_on_tangle(self)
+    def update_state(self, state: "TangleState", add: bool = True):
+        state.update_tx_on_tangle(self, add)
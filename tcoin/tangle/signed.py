@@ -1,9 +1,32 @@
 from base64 import b64encode
 
+from tcoin.config import signature_cache_size
+from tcoin.utils import LRUCache
 from tcoin.wallet import Wallet
 
 
+class SignatureCache(LRUCache):
+    """
+    Least recently used set of the (address, hash, signature) triples that
+    were verified so the same message isn't verified again on every check
+    """
+
+    def __init__(self, size: int = signature_cache_size):
+        super().__init__(size)
+
+    def check(self, key: tuple[str, str, str]) -> bool:
+        return self.get(key, False)
+
+    def add(self, key: tuple[str, str, str]):
+        self.put(key, True)
+
+
 class Signed:
+    __slots__ = ("hash", "signature")
+
+    # Signatures that were already found to be valid
+    signature_cache = SignatureCache()
+
     def __init__(self, hash: str = None, signature: str = None):
         self.hash = hash
         self.signature = signature
@@ -18,9 +41,23 @@ class Signed:
 
     @property
     def is_signature_valid(self) -> bool:
-        return self.is_signed and Wallet.is_signature_valid(
+        if not self.is_signed:
+            return False
+
+        key = (self.address, self.hash, self.signature)
+
+        # Only invalid signatures and ones that were evicted are verified
+        if self.signature_cache.check(key):
+            return True
+
+        if not Wallet.is_signature_valid(
             self.address, self.signature, self.hash
-        )
+        ):
+            return False
+
+        self.signature_cache.add(key)
+
+        return True
 
     def sign(self, wallet: Wallet):
         if self.hash is None:
@@ -0,0 +1,86 @@
+from typing import TYPE_CHECKING
+
+from .indexes import ChildrenIndex
+
+if TYPE_CHECKING:
+    from .messages import Message
+    from .tangle import TangleState
+
+
+class Snapshot:
+    """
+    Balance checkpoint of the finalized messages pruned from the tangle
+
+    state -- balance changes made by all of the pruned messages
+    timestamp -- newest timestamp of a pruned message
+    counts -- amount of pruned messages of each issuer
+    frontier -- pruned messages that are still approved by retained ones
+    """
+
+    def __init__(
+        self,
+        state: "TangleState" = None,
+        timestamp: int = 0,
+        counts: dict[str, int] = None,
+        frontier: set[str] = None,
+    ):
+        from .tangle import TangleState
+
+        if state is None:
+            state = TangleState()
+
+        if counts is None:
+            counts = {}
+
+        if frontier is None:
+            frontier = set()
+
+        self.state = state
+        self.timestamp = timestamp
+        self.counts = counts  # address: amount of pruned messages
+        self.frontier = frontier
+
+    def __contains__(self, msg_hash: str) -> bool:
+        return msg_hash in self.frontier
+
+    def add_msg(self, msg: "Message"):
+        msg.update_state(self.state)
+
+        self.timestamp = max(self.timestamp, msg.timestamp)
+        self.counts[msg.address] = self.counts.get(msg.address, 0) + 1
+
+    def update_frontier(self, pruned: list[str], children: ChildrenIndex):
+        # Keeping the pruned messages that retained messages still approve
+        self.frontier = {
+            _id for _id in self.frontier | set(pruned) if children.get(_id)
+        }
+
+    def get_count(self, address: str) -> int:
+        return self.counts.get(address, 0)
+
+    def copy(self) -> "Snapshot":
+        return Snapshot(
+            state=self.state.copy(),
+            timestamp=self.timestamp,
+            counts=dict(self.counts),
+            frontier=set(self.frontier),
+        )
+
+    def to_dict(self):
+        return {
+            "wallets": self.state.wallets,
+            "timestamp": self.timestamp,
+            "counts": self.counts,
+            "frontier": list(self.frontier),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        from .tangle import TangleState
+
+        return cls(
+            state=TangleState(dict(data["wallets"])),
+            timestamp=data["timestamp"],
+            counts=data["counts"],
+            frontier=set(data["frontier"]),
+        )
@@ -0,0 +1,146 @@
+import random
+from collections.abc import Mapping
+from enum import Enum
+from itertools import chain
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    from .messages import Message
+
+
+class MsgStatus(Enum):
+    APPROVED = "approved"
+    STRONG_TIP = "strong_tip"
+    WEAK_TIP = "weak_tip"
+
+    @property
+    def is_tip(self):
+        return self is not MsgStatus.APPROVED
+
+
+class MessageView(Mapping):
+    """Read-only view of the messages in the store with certain statuses"""
+
+    def __init__(self, store: "MessageStore", *statuses: MsgStatus):
+        self.pools = [store.pools[s] for s in statuses]
+
+    def __getitem__(self, msg_hash: str) -> "Message":
+        for pool in self.pools:
+            if msg_hash in pool:
+                return pool[msg_hash]
+
+        raise KeyError(msg_hash)
+
+    def __contains__(self, msg_hash: str) -> bool:
+        return any(msg_hash in pool for pool in self.pools)
+
+    def __iter__(self) -> Iterator[str]:
+        return chain.from_iterable(self.pools)
+
+    def __len__(self) -> int:
+        return sum(len(pool) for pool in self.pools)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({dict(self)})"
+
+
+class MessageStore:
+    """Stores every message of the tangle along with its status"""
+
+    def __init__(self):
+        self.pools: dict[MsgStatus, dict[str, "Message"]] = {
+            s: {} for s in MsgStatus
+        }
+        self.status: dict[str, MsgStatus] = {}  # hash: status
+
+        # Tip hashes kept in a list so that they can be sampled in O(k)
+        self.tip_list: list[str] = []
+        self.tip_positions: dict[str, int] = {}  # hash: index in tip_list
+
+        # Views that never copy the underlying pools
+        self.approved = MessageView(self, MsgStatus.APPROVED)
+        self.strong_tips = MessageView(self, MsgStatus.STRONG_TIP)
+        self.weak_tips = MessageView(self, MsgStatus.WEAK_TIP)
+        self.tips = MessageView(self, MsgStatus.STRONG_TIP, MsgStatus.WEAK_TIP)
+        self.all = MessageView(self, *MsgStatus)
+
+    def __contains__(self, msg_hash: str) -> bool:
+        return msg_hash in self.status
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def get(self, msg_hash: str) -> "Message | None":
+        status = self.status.get(msg_hash, None)
+
+        if status is None:
+            return None
+
+        return self.pools[status][msg_hash]
+
+    def get_status(self, msg_hash: str) -> MsgStatus | None:
+        return self.status.get(msg_hash, None)
+
+    def add(self, msg: "Message", status: MsgStatus):
+        self.remove(msg.hash)
+
+        self.pools[status][msg.hash] = msg
+        self.status[msg.hash] = status
+
+        if status.is_tip:
+            self._add_tip(msg.hash)
+
+    def set_status(self, msg_hash: str, status: MsgStatus):
+        old_status = self.status.get(msg_hash, None)
+
+        if old_status is None or old_status is status:
+            return
+
+        self.pools[status][msg_hash] = self.pools[old_status].pop(msg_hash)
+        self.status[msg_hash] = status
+
+        if status.is_tip and not old_status.is_tip:
+            self._add_tip(msg_hash)
+
+        elif old_status.is_tip and not status.is_tip:
+            self._remove_tip(msg_hash)
+
+    def remove(self, msg_hash: str) -> "Message | None":
+        status = self.status.pop(msg_hash, None)
+
+        if status is None:
+            return None
+
+        if status.is_tip:
+            self._remove_tip(msg_hash)
+
+        return self.pools[status].pop(msg_hash)
+
+    def copy(self) -> "MessageStore":
+        store = MessageStore()
+
+        # Filling the new pools as the views point to them
+        for status, pool in self.pools.items():
+            store.pools[status].update(pool)
+
+        store.status = dict(self.status)
+        store.tip_list = list(self.tip_list)
+        store.tip_positions = dict(self.tip_positions)
+
+        return store
+
+    def sample_tips(self, amt: int) -> list[str]:
+        return random.sample(self.tip_list, min(amt, len(self.tip_list)))
+
+    def _add_tip(self, msg_hash: str):
+        self.tip_positions[msg_hash] = len(self.tip_list)
+        self.tip_list.append(msg_hash)
+
+    def _remove_tip(self, msg_hash: str):
+        i = self.tip_positions.pop(msg_hash)
+        last = self.tip_list.pop()
+
+        # Moving the last tip into the freed slot
+        if last != msg_hash:
+            self.tip_list[i] = last
+            self.tip_positions[last] = i
@@ -1,29 +1,30 @@
-import random
+import heapq
+import logging
 import time
-from functools import lru_cache
+from threading import RLock
 from typing import Callable
 
-from tcoin.config import (
-    invalid_msg_pool_purge_time,
-    invalid_msg_pool_size,
-    secure_storage,
-)
+from tcoin.config import secure_storage, storage_backend, tangle_analytics
 from tcoin.constants import (
-    BASE_DIFFICULTY,
     FINALITY_SCORE,
-    GAMMA,
     MAIN_THRESHOLD,
     MAX_PARENTS,
     MAX_TIP_AGE,
-    TIME_WINDOW,
 )
-from tcoin.utils import get_raw_hash, load_storage_file, save_storage_file
 from tcoin.wallet import Wallet
 
+from .analytics import ColumnarView
+from .backends import BRANCH_EVENTS, StorageBackend, storage_backends
+from .commitment import Commitment
+from .difficulty import DifficultyEngine
+from .indexes import BranchIndex, ChildrenIndex, IssuerIndex
+from .invalid_pool import InvalidMsgPool
 from .messages import Message, Transaction, genesis_msg, message_lookup
 from .signed import Signed
-
-TANGLE_PATH = "tangle"
+from .snapshot import Snapshot
+from .store import MessageStore, MsgStatus
+from .tip_selection import TipSelector, UniformTipSelector
+from .verifier import verify_many
 
 
 class TangleState:
@@ -32,48 +33,46 @@ class TangleState:
     def __init__(
         self,
         wallets: dict[str, int] = None,
-        invalid_msg_pool: dict[str, int] = None,
+        invalid_msg_pool: dict[str, int] | InvalidMsgPool = None,
     ):
         if wallets is None:
             wallets = {}
 
-        if invalid_msg_pool is None:
-            invalid_msg_pool = {}
+        if not isinstance(invalid_msg_pool, InvalidMsgPool):
+            invalid_msg_pool = InvalidMsgPool(invalid_msg_pool)
 
         self.wallets = wallets  # address: balance
-        self.invalid_msg_pool = (
-            invalid_msg_pool  # hash: timestamp of last access
-        )
+        self.invalid_msg_pool = invalid_msg_pool
 
-    def add_invalid_msg(self, msg_hash: str):
-        self.invalid_msg_pool[msg_hash] = int(time.time())
+        # Commitment that is kept up to date with the balances
+        self.commitment: Commitment | None = None
 
-    def in_invalid_pool(self, msg_hash: str):
-        in_pool = msg_hash in self.invalid_msg_pool
-
-        if in_pool:
-            # Updating the access time
-            self.add_invalid_msg(msg_hash)
+    def attach(self, commitment: Commitment):
+        self.commitment = commitment
 
-        # Purging invalid messages that haven't been accessed in a while
-        self.invalid_msg_pool = {
-            _id: t
-            for _id, t in self.invalid_msg_pool.items()
-            if t + invalid_msg_pool_purge_time >= time.time()
-        }
+        for address, balance in self.wallets.items():
+            commitment.update_balance(address, 0, balance)
 
-        # Purging the oldest invalid messages
-        self.invalid_msg_pool = dict(
-            sorted(self.invalid_msg_pool, key=lambda m: m[1])[
-                invalid_msg_pool_size:
-            ]
-        )
+    def add_invalid_msg(self, msg_hash: str):
+        self.invalid_msg_pool.add(msg_hash)
 
-        return in_pool
+    def in_invalid_pool(self, msg_hash: str):
+        return self.invalid_msg_pool.check(msg_hash)
 
     def get_balance(self, address: str):
         return self.wallets.get(address, 0)
 
+    def set_balance(self, address: str, balance: int, *, keep_empty=False):
+        old = self.get_balance(address)
+
+        if balance == 0 and not keep_empty:
+            self.wallets.pop(address, None)
+        else:
+            self.wallets[address] = balance
+
+        if self.commitment is not None:
+            self.commitment.update_balance(address, old, balance)
+
     def update_tx_on_tangle(self, msg: Transaction, add: bool = True):
         t = msg.get_transaction()
 
@@ -86,29 +85,68 @@ class TangleState:
 
         # Checking if it is a genesis message
         if msg.node_id != "0":
-            if sender_bal == 0:
-                del self.wallets[msg.node_id]
-            else:
-                self.wallets[msg.node_id] = sender_bal
+            self.set_balance(msg.node_id, sender_bal)
+
+        self.set_balance(t.receiver, receiver_bal, keep_empty=True)
+
+    def apply_delta(self, delta: dict[str, int]):
+        for address, change in delta.items():
+            self.set_balance(address, self.get_balance(address) + change)
+
+    def copy(self) -> "TangleState":
+        return TangleState(dict(self.wallets), self.invalid_msg_pool.to_dict())
+
+
+class LayeredTangleState:
+    """
+    Stacks branch states on top of a state without copying any of them
 
-        self.wallets[t.receiver] = receiver_bal
+    Each layer is a state along with the sign that its balances are
+    applied with, so lookups go through every layer instead of merging.
+    """
 
-    def add_dict_states(self, x: dict, y: dict, add=True) -> dict:
-        if add:
-            return {k: x.get(k, 0) + y.get(k, 0) for k in x | y}
+    def __init__(
+        self,
+        base: TangleState,
+        layers: list[tuple[TangleState, int]] = None,
+    ):
+        if layers is None:
+            layers = []
 
-        return {k: x.get(k, 0) - y.get(k, 0) for k in x | y}
+        self.base = base
+        self.layers = layers
 
-    def merge(self, state: "TangleState", add=True):
-        # Merging the wallet states
-        wallets = self.add_dict_states(self.wallets, state.wallets, add)
+    def push(self, state: TangleState, add: bool = True):
+        self.layers.append((state, 1 if add else -1))
 
-        # Merging the invalid message pool
-        invalid_msg_pool = self.add_dict_states(
-            self.invalid_msg_pool, state.invalid_msg_pool, add
+    def get_balance(self, address: str):
+        return self.base.get_balance(address) + sum(
+            sign * state.get_balance(address) for state, sign in self.layers
+        )
+
+    def in_invalid_pool(self, msg_hash: str):
+        return self.base.in_invalid_pool(msg_hash) or any(
+            state.in_invalid_pool(msg_hash)
+            for state, sign in self.layers
+            if sign > 0
         )
 
-        return TangleState(wallets, invalid_msg_pool)
+    def collapse(self) -> TangleState:
+        """Applies the layers to the base state, only touching their addresses"""
+
+        for state, sign in self.layers:
+            self.base.apply_delta(
+                {address: sign * b for address, b in state.wallets.items()}
+            )
+
+            # Keeping the invalid messages of the branches that were applied
+            if sign > 0:
+                for msg_hash in state.invalid_msg_pool.to_dict():
+                    self.base.add_invalid_msg(msg_hash)
+
+        self.layers = []
+
+        return self.base
 
 
 class BranchReference:
@@ -139,6 +177,27 @@ class Branch:
         self.branches = branches
         self.state = state
 
+        # Total approval weight of the messages in the branch
+        self.weight = 0
+
+        # Children and issuers of every message in the branch
+        self.children = ChildrenIndex()
+        self.issuers = IssuerIndex()
+
+        # Strong parents missing from the branch: {parent hash: child hashes}
+        self.unknown_parents: dict[str, set[str]] = {}
+
+        # Manager that the branch belongs to
+        self.manager: BranchManager | None = None
+
+        # Tangle-wide index of the messages in every branch
+        self.branch_index: BranchIndex | None = None
+
+        msgs, self.msgs = self.msgs, {}
+
+        for msg in msgs.values():
+            self.index_msg(msg)
+
         self.add_msg(founder)
 
     @property
@@ -147,21 +206,10 @@ class Branch:
 
     @property
     def approval_weight(self):
-        return sum(m.approval_weight for m in self.msgs.values())
-
-    def find_children(self, msg: Message) -> dict[str, Message] | None:
-        def _search(msg_ids: list[str]):
-            results = {}
-            for _id, m in self.msgs.items():
-                if _id in msg_ids:
-                    results[_id] = m
-
-            if results:
-                return _search(results)
+        return self.weight
 
-            return {}
-
-        return _search([msg.hash])
+    def find_children(self, msg: Message) -> dict[str, Message]:
+        return self.children.find_descendants(msg.hash, self.msgs.get)
 
     def add_branch(self, branch: "BranchManager"):
         if self.id is None:
@@ -169,37 +217,113 @@ class Branch:
 
         self.branches[branch.id] = branch
 
+        branch.parent = self
+
+        if self.branch_index is not None:
+            branch.attach(self.branch_index)
+
+    def attach(self, index: BranchIndex):
+        """Adds the messages of the branch and its sub-branches to an index"""
+
+        self.branch_index = index
+
+        for msg_hash in self.msgs:
+            index.add(msg_hash, self)
+
+        for m in self.branches.values():
+            m.attach(index)
+
+    def detach(self):
+        if self.branch_index is None:
+            return
+
+        for msg_hash in self.msgs:
+            self.branch_index.remove(msg_hash, self)
+
+        self.branch_index = None
+
+        for m in self.branches.values():
+            m.detach()
+
     def find_new_duplicate(self, msg: Message):
-        for _id, m in self.msgs.items():
-            if _id == msg.id:
-                return m
+        msg_hash = self.issuers.find(msg.id)
 
-        return None
+        if msg_hash is None:
+            return None
+
+        return self.msgs.get(msg_hash, None)
 
     def find_existing_duplicate(self, msg: Message):
-        for _id in self.branches:
-            if _id == msg.id:
-                return _id
+        if msg.id in self.branches:
+            return msg.id
 
         return None
 
-    def get_conflict_msgs(self, msg_hashes: set[str]) -> set[str]:
-        # TODO: cache this
-        shared_msgs = msg_hashes & set(self.msgs)
-
-        for m in self.branches.values():
-            for b in m.conflicts.values():
-                shared_msgs |= b.get_conflict_msgs(msg_hashes)
+    @property
+    def is_conflict(self):
+        """Whether the branch is a conflict (not the main branch) of its manager"""
 
-        return shared_msgs
+        return (
+            self.manager is not None
+            and self.manager.conflicts.get(self.id, None) is self
+        )
 
     @property
     def is_final(self):
         return self.approval_weight >= FINALITY_SCORE
 
+    @property
+    def has_unknown_parents(self):
+        return bool(self.unknown_parents)
+
+    def index_msg(self, msg: Message):
+        self.msgs[msg.hash] = msg
+        self.weight += msg.approval_weight
+        self.children.add(msg)
+        self.issuers.add(msg)
+
+        for p, t in zip(msg.parent_hashes, msg.parent_types):
+            if t and p not in self.msgs:
+                self.unknown_parents.setdefault(p, set()).add(msg.hash)
+
+        self.unknown_parents.pop(msg.hash, None)
+
+        if self.branch_index is not None:
+            self.branch_index.add(msg.hash, self)
+
+    def unindex_msg(self, msg: Message):
+        del self.msgs[msg.hash]
+        self.weight -= msg.approval_weight
+        self.children.remove(msg)
+        self.issuers.remove(msg)
+
+        if self.branch_index is not None:
+            self.branch_index.remove(msg.hash, self)
+
+        for p in msg.parent_hashes:
+            children = self.unknown_parents.get(p, None)
+
+            if children is None:
+                continue
+
+            children.discard(msg.hash)
+
+            if not children:
+                del self.unknown_parents[p]
+
+        # Children that strongly approve the message now have an unknown parent
+        strong_children = {
+            c
+            for c in self.children.get(msg.hash)
+            if self.msgs[c].parents.get(msg.hash, False)
+        }
+
+        if strong_children:
+            self.unknown_parents[msg.hash] = strong_children
+
     def remove_msg(self, msg: Message):
         if msg.hash in self.msgs:
-            del self.msgs[msg.hash]
+            self.unindex_msg(msg)
 
             msg.update_state(self.state, add=False)
 
@@ -212,7 +336,7 @@ class Branch:
             return
 
         # TODO: add support for weak parents
-        self.msgs[msg.hash] = msg
+        self.index_msg(msg)
 
         msg.update_state(self.state)
 
@@ -225,7 +349,7 @@ class Branch:
 
     @classmethod
     def from_dict(cls, data: dict):
-        founder_msg = Message.from_dict(data["founder"])
+        founder_msg = message_lookup(data["founder"])
 
         branch = cls(founder_msg)
 
@@ -268,19 +392,101 @@ class BranchManager:
 
         self.nesting = nesting
 
+        # Branch that the manager is nested in
+        self.parent: Branch | None = None
+
+        # Tangle-wide index of the messages in every branch
+        self.branch_index: BranchIndex | None = None
+
+        self.main_branch.manager = self
+
+        for c in self.conflicts.values():
+            c.manager = self
+
+        # Heaviest conflict and the weight it had when it was last checked
+        self.heaviest: Branch | None = None
+        self.heaviest_weight = 0
+
+        self.find_heaviest()
+
+    def find_heaviest(self):
+        self.heaviest = max(
+            self.conflicts.values(),
+            key=lambda c: c.approval_weight,
+            default=None,
+        )
+
+        self.heaviest_weight = (
+            0 if self.heaviest is None else self.heaviest.approval_weight
+        )
+
+    def update_heaviest(self, branch: Branch):
+        """Updates the heaviest conflict after the weight of a branch changed"""
+
+        if branch is self.heaviest:
+            # Only searching all the conflicts if the heaviest got lighter
+            if branch.approval_weight < self.heaviest_weight:
+                self.find_heaviest()
+            else:
+                self.heaviest_weight = branch.approval_weight
+
+        elif (
+            self.heaviest is None
+            or branch.approval_weight > self.heaviest_weight
+        ):
+            self.heaviest = branch
+            self.heaviest_weight = branch.approval_weight
+
+    @property
+    def all_branches(self) -> list[Branch]:
+        return [self.main_branch, *self.conflicts.values()]
+
+    def attach(self, index: BranchIndex):
+        self.branch_index = index
+
+        for b in self.all_branches:
+            b.attach(index)
+
+    def detach(self):
+        self.branch_index = None
+
+        for b in self.all_branches:
+            b.detach()
+
     def add_conflict(self, branch: Branch):
         self.conflicts[branch.id] = branch
 
+        branch.manager = self
+
+        if self.branch_index is not None and branch.branch_index is None:
+            branch.attach(self.branch_index)
+
+        self.update_heaviest(branch)
+
     def remove_conflict(self, branch: Branch):
         if branch.id in self.conflicts:
             del self.conflicts[branch.id]
 
+            if branch is self.heaviest:
+                self.find_heaviest()
+
+    def get_branch(self, branch_id: str) -> Branch | None:
+        if self.main_branch.id == branch_id:
+            return self.main_branch
+
+        return self.conflicts.get(branch_id, None)
+
+    def set_main_branch(self, branch: Branch):
+        self.remove_conflict(branch)
+        self.add_conflict(self.main_branch)
+
+        self.main_branch = branch
+        self.main_branch.manager = self
+
     def get_heaviest_branch(self):
-        heaviest = max(
-            self.conflicts.values(), key=lambda c: c.approval_weight
-        )
+        heaviest = self.heaviest
 
-        if self.main_branch.is_final:
+        if heaviest is None or self.main_branch.is_final:
             return None
 
         if heaviest.is_final:
@@ -294,42 +500,40 @@ class BranchManager:
         return None
 
     def update_conflict(self, tangle: "Tangle", branch: Branch):
-        all_branch_msgs = set(branch.msgs)
-
         # Checking if the parents of each message are known
-        for msg in branch.msgs.values():
-            valid_parents = {_id for _id, t in msg.parents.items() if t}
+        if branch.has_unknown_parents:
+            return
 
-            if valid_parents - all_branch_msgs:
-                return
+        # Branches that are already part of the manager are logged by id
+        known = any(b is branch for b in self.all_branches)
 
-        self.conflicts[branch.id] = branch
+        self.add_conflict(branch)
+
+        tangle.log_branch(
+            "add_conflict",
+            self,
+            branch=branch.id if known else branch.to_dict(),
+        )
 
         # Findind the heaviest branch
         heaviest = self.get_heaviest_branch()
 
-        if heaviest is None:
-            return
+        if heaviest is not None:
+            # Moving the messages in bulk and collapsing the branch states
+            tangle.swap_branch(self.main_branch, heaviest)
 
-        # Swapping the main branch with the heaviest branch
-        self.remove_conflict(heaviest)
-        self.add_conflict(self.main_branch)
-
-        # Removing the main branch messages from the tangle
-        for msg in self.main_branch.msgs.values():
-            tangle.remove_msg(msg)
-
-        # Updating the main branch
-        self.main_branch = branch
+            # Swapping the main branch with the heaviest branch
+            self.set_main_branch(heaviest)
 
-        # Adding in reverse order so that each message has an existing parent
-        for msg in list(branch.msgs.values())[::-1]:
-            tangle.add_msg(msg)
+            tangle.log_branch("set_main_branch", self, branch=heaviest.id)
 
-        # Checking if the new main branches is final
+        # The state of a final main branch is already collapsed into the
+        # tangle's so only the manager has to be dropped
         if self.main_branch.is_final:
             tangle.remove_branch(self.id)
 
+            tangle.log_branch("remove_branch", self)
+
     @property
     def id(self):
         return (self.node_id, self.index)
@@ -348,7 +552,9 @@ class BranchManager:
         return cls(
             node_id=data["node_id"],
             index=data["index"],
-            conflicts=[Branch.from_dict(c) for c in data["conflicts"]],
+            conflicts={
+                (b := Branch.from_dict(c)).id: b for c in data["conflicts"]
+            },
             main_branch=Branch.from_dict(data["main_branch"]),
             nesting=data["nesting"],
         )
@@ -358,42 +564,121 @@ class Tangle(Signed):
     def __init__(
         self,
         *,
-        msgs: dict[str, Message] = {},
-        branches: dict[tuple[str, int], BranchManager] = {},
-        strong_tips: dict[str, Message] = {},
-        weak_tips: dict[str, Message] = {},
+        msgs: dict[str, Message] = None,
+        branches: dict[tuple[str, int], BranchManager] = None,
+        strong_tips: dict[str, Message] = None,
+        weak_tips: dict[str, Message] = None,
         state: TangleState = None,
+        snapshot: Snapshot = None,
+        tip_selector: TipSelector = None,
+        storage: StorageBackend = None,
         hash: str = None,
         signature: str = None,
     ):
 
         super().__init__(hash=hash, signature=signature)
 
+        if msgs is None:
+            msgs = {}
+
+        if branches is None:
+            branches = {}
+
+        if strong_tips is None:
+            strong_tips = {}
+
+        if weak_tips is None:
+            weak_tips = {}
+
         if state is None:
             state = TangleState()
 
+        if snapshot is None:
+            snapshot = Snapshot()
+
+        if tip_selector is None:
+            tip_selector = UniformTipSelector()
+
         # State of the main tangle
         self.state = state
 
-        self.strong_tips = strong_tips  # hash: msg
-        self.weak_tips = weak_tips  # hash: msg
+        # Finalized history that was pruned from the tangle
+        self.snapshot = snapshot
 
-        # Main branch messages
-        self.msgs = msgs
+        # Strategy used to choose the parents of new messages
+        self.tip_selector = tip_selector
+
+        # Backend that the tangle and its changes are saved to
+        self.storage = storage
+
+        # Held while the tangle changes so that a consistent copy can be taken
+        self.lock = RLock()
+
+        # Main branch messages and tips along with their status
+        self.store = MessageStore()
 
         # Conflicting branches
         self.branches = branches  # (node_id, index): BranchManager
 
+        # Branches that contain each message
+        self.branch_index = BranchIndex()
+
+        for m in self.branches.values():
+            m.attach(self.branch_index)
+
+        # Children and issuers of every message in the main tangle
+        self.children = ChildrenIndex()
+        self.issuers = IssuerIndex()
+
+        # Timestamps of the main tangle messages used to get the difficulty
+        self.difficulty = DifficultyEngine()
+
+        # Min-heap of (expiry time, hash) used to purge old tips
+        self.tip_expiry: list[tuple[int, str]] = []
+
+        # Columns of the message fields for aggregate queries (needs numpy)
+        self.analytics: ColumnarView | None = None
+
+        # Commitment over the messages and balances used to check saves
+        self.commitment = Commitment()
+        self.state.attach(self.commitment)
+
+        for pool, status in (
+            (msgs, MsgStatus.APPROVED),
+            (strong_tips, MsgStatus.STRONG_TIP),
+            (weak_tips, MsgStatus.WEAK_TIP),
+        ):
+            for msg in pool.values():
+                self.add_to_store(msg, status)
+                self.index_msg(msg)
+
+        for msg in self.msgs.values():
+            self.difficulty.add(msg)
+
+        self.tip_selector.attach(self)
+
         if not self.msgs:
             self.add_msg(genesis_msg)
 
+    @property
+    def msgs(self):
+        return self.store.approved
+
+    @property
+    def strong_tips(self):
+        return self.store.strong_tips
+
+    @property
+    def weak_tips(self):
+        return self.store.weak_tips
+
     @property
     def all_tips(self):
-        return {**self.strong_tips, **self.weak_tips}
+        return self.store.tips
 
     @property
     def all_msgs(self):
-        return {**self.msgs, **self.all_tips}
+        return self.store.all
 
     @property
     def get_balance(self):
@@ -401,98 +686,209 @@ class Tangle(Signed):
 
     def get_rep(self, address: str):
         # TODO: implement a proper reputation system
-        return sum(m.node_id == address for m in self.all_msgs.values())
+        return self.issuers.get_count(address) + self.snapshot.get_count(
+            address
+        )
 
-    def remove_msg(self, msg: Message):
-        removed = True
+    def index_msg(self, msg: Message):
+        self.children.add(msg)
+        self.issuers.add(msg)
+        self.tip_selector.add_msg(self, msg)
+        self.commitment.add_msg(msg)
 
-        if msg.hash in self.msgs:
-            del self.msgs[msg.hash]
+        if self.analytics is not None:
+            status = self.store.get_status(msg.hash)
+            self.analytics.add(msg, status is MsgStatus.APPROVED)
 
-        elif msg.hash in self.strong_tips:
-            del self.strong_tips[msg.hash]
+    def unindex_msg(self, msg: Message):
+        if self.analytics is not None:
+            self.analytics.remove(msg.hash)
 
-        elif msg.hash in self.weak_tips:
-            del self.weak_tips[msg.hash]
+        self.commitment.remove_msg(msg)
+        self.tip_selector.remove_msg(self, msg)
+        self.children.remove(msg)
+        self.issuers.remove(msg)
 
-        else:
-            removed = False
+    def enable_analytics(self):
+        """Keeps the messages in numpy columns from now on (needs numpy)"""
+
+        if self.analytics is not None:
+            return
+
+        self.analytics = ColumnarView()
 
-        if removed:
+        approved, tips = list(self.msgs.values()), list(self.all_tips.values())
+
+        # Adding the current messages in bulk
+        self.analytics.add_many(
+            approved + tips, [True] * len(approved) + [False] * len(tips)
+        )
+
+    def set_tip_selector(self, tip_selector: TipSelector):
+        self.tip_selector = tip_selector
+        self.tip_selector.attach(self)
+
+    def remove_msg(self, msg: Message, update_state: bool = True):
+        status = self.store.get_status(msg.hash)
+
+        if status is None:
+            return
+
+        self.store.remove(msg.hash)
+
+        if status is MsgStatus.APPROVED:
+            self.difficulty.remove(msg)
+
+        self.unindex_msg(msg)
+
+        # Removals without a state update are part of a swap or a prune
+        if update_state:
             self.state.update_tx_on_tangle(msg, add=False)
 
-    def purge_tips(self, tips):
-        current_time = time.time()
+            self.log_event("remove_msg", hash=msg.hash)
+
+    def has_enough_children(self, msg_hash: str) -> bool:
+        return self.children.has_many_descendants(
+            msg_hash, self.store.__contains__
+        )
+
+    def swap_branch(self, old: "Branch", new: "Branch"):
+        """Replaces the messages of a branch in the tangle with another's"""
 
-        valid_tips, invalid_tips = {}, {}
+        # Messages of the old branch that expired are no longer in the tangle
+        removed = [m for m in old.msgs.values() if m.hash in self.store]
+        expired = [m for m in old.msgs.values() if m.hash not in self.store]
 
-        for _id, msg in tips.items():
-            if msg.timestamp + MAX_TIP_AGE >= current_time:
-                valid_tips[_id] = msg
+        for msg in removed:
+            self.remove_msg(msg, update_state=False)
+
+        added = [m for m in new.msgs.values() if m.hash not in self.store]
+        kept = [m for m in new.msgs.values() if m.hash in self.store]
+
+        for msg in added:
+            # Using the children within the branch to find approved messages
+            if new.children.has_many_descendants(
+                msg.hash, new.msgs.__contains__
+            ):
+                self.add_to_store(msg, MsgStatus.APPROVED)
+                self.difficulty.add(msg)
             else:
-                invalid_tips[_id] = msg
+                self.add_to_store(msg, MsgStatus.STRONG_TIP)
 
-        # Updating the state to reflect the removal of the invalid tips
-        for _id, msg in invalid_tips.items():
-            self.state.update_tx_on_tangle(msg, add=False)
+            self.index_msg(msg)
 
-        # Checking for the genesis message only once per purge
-        if genesis_msg.hash in tips:
-            valid_tips[genesis_msg.hash] = tips[genesis_msg.hash]
+        # Approving the parent tips outside the branch
+        for p in {
+            p for m in added for p in m.parent_hashes if p not in new.msgs
+        }:
+            if self.store.get_status(p) is not MsgStatus.STRONG_TIP:
+                continue
 
-        return valid_tips
+            if self.has_enough_children(p):
+                self.add_approved_msg(self.store.get(p))
 
-    def select_tips(self):
-        # Purging tips that are too old
-        self.strong_tips = self.purge_tips(self.strong_tips)
-        self.weak_tips = self.purge_tips(self.weak_tips)
+        # Applying the balance changes between the branches
+        state = LayeredTangleState(self.state)
+        state.push(new.state)
+        state.push(old.state, add=False)
+
+        # Expired messages were already reverted and kept ones are still
+        # applied so the branch states count them once too often
+        correction = TangleState()
+
+        for msg in expired:
+            msg.update_state(correction)
+
+        for msg in kept:
+            msg.update_state(correction, add=False)
+
+        state.push(correction)
+        state.collapse()
+
+        # Logging once the swap is done so backends see the swapped tangle
+        self.log_event(
+            "swap",
+            old=[m.to_dict() for m in old.msgs.values()],
+            new=[m.to_dict() for m in new.msgs.values()],
+        )
+
+    def add_to_store(self, msg: Message, status: MsgStatus):
+        self.store.add(msg, status)
+
+        if status.is_tip:
+            heapq.heappush(
+                self.tip_expiry, (msg.timestamp + MAX_TIP_AGE, msg.hash)
+            )
 
-        if self.all_tips == {}:
-            return {genesis_msg.hash: True}
+    def purge_tips(self):
+        current_time = time.time()
+
+        # Callers like the cli don't hold the lock while the node is running
+        with self.lock:
+            # Only popping the tips that have expired
+            while self.tip_expiry and self.tip_expiry[0][0] < current_time:
+                _, msg_hash = heapq.heappop(self.tip_expiry)
+
+                # Skipping entries of tips that were approved or removed
+                status = self.store.get_status(msg_hash)
+
+                if status is None or not status.is_tip:
+                    continue
+
+                if msg_hash == genesis_msg.hash:
+                    continue
 
-        amt = min(len(self.all_tips), MAX_PARENTS)
+                # Updating the state to reflect the removal of the expired tip
+                self.remove_msg(self.store.get(msg_hash))
 
-        tip_ids = random.sample(self.all_tips.keys(), amt)
+            # Dropping stale entries once they outnumber the live tips
+            if len(self.tip_expiry) > 2 * len(self.all_tips) + MAX_PARENTS:
+                self.tip_expiry = [
+                    e for e in self.tip_expiry if e[1] in self.all_tips
+                ]
+                heapq.heapify(self.tip_expiry)
+
+    def select_tips(self):
+        with self.lock:
+            # Purging tips that are too old
+            self.purge_tips()
+
+            if not self.all_tips:
+                return {genesis_msg.hash: True}
+
+            tip_ids = self.tip_selector.select(self, MAX_PARENTS)
 
         # Mapping the tips to their tip type
         return {_id: _id not in self.weak_tips for _id in tip_ids}
 
-    def add_approved_msg(self, msg: Message, strong: bool = True):
-        if msg.hash in self.msgs:
+    def add_approved_msg(self, msg: Message):
+        status = self.store.get_status(msg.hash)
+
+        if status is MsgStatus.APPROVED:
             return
 
-        self.msgs[msg.hash] = msg
+        self.difficulty.add(msg)
 
-        if msg.hash in self.all_tips:
-            if strong:
-                del self.strong_tips[msg.hash]
-            else:
-                del self.weak_tips[msg.hash]
-        else:
-            msg.update_state(self.state)
+        if status is not None:
+            self.store.set_status(msg.hash, MsgStatus.APPROVED)
+
+            if self.analytics is not None:
+                self.analytics.set_approved(msg.hash)
+
+            return
+
+        self.add_to_store(msg, MsgStatus.APPROVED)
+        self.index_msg(msg)
+        msg.update_state(self.state)
 
     def find_children(
         self,
         msg_id: str,
         *,
         stop: Callable[[dict[str, Message]], bool] = None,
-        total: dict[str, Message] = {},
     ) -> dict[str, Message]:
-        # Recursively finding all the children
-        children = {
-            _id: m for _id, m in self.all_msgs.items() if msg_id in m.parents
-        }
-
-        total.update(children)
-
-        if stop is not None:
-            if stop(total):
-                return total
-
-        for c in children:
-            total = self.find_children(c, stop=stop, total=total)
-
-        return total
+        # Walking the children index instead of scanning every message
+        return self.children.find_descendants(msg_id, self.get_msg, stop=stop)
 
     def add_msg(self, msg: Message, invalid_parents: list[str] = []):
         # Updating the state without approval if it's the genesis message
@@ -502,75 +898,133 @@ class Tangle(Signed):
 
         # Only validating tips if the message does not contain invalid parents
         if not invalid_parents:
-            for p in msg.parents:
+            for p in msg.parent_hashes:
                 if p == genesis_msg.hash:
                     continue
 
                 p_msg: Message = self.get_msg(p)
 
-                # Getting the total amount of children of the parent tip
-                total_children = len(self.find_children(p))
+                if p_msg is None:
+                    continue
 
-                if total_children > 1:
+                # Approving the parent tip if it has more than one descendant
+                if self.has_enough_children(p):
                     self.add_approved_msg(p_msg)
 
-        if msg.hash not in self.all_msgs:
+        if msg.hash not in self.store:
             if not invalid_parents:
-                self.strong_tips[msg.hash] = msg
+                self.add_to_store(msg, MsgStatus.STRONG_TIP)
             else:
                 # If there are invalid parents, the tip is added to the weak pool
-                self.weak_tips[msg.hash] = msg
+                self.add_to_store(msg, MsgStatus.WEAK_TIP)
+
+            self.index_msg(msg)
 
             # Updating the state
             msg.update_state(self.state)
 
+            self.log_event(
+                "add_msg",
+                msg=msg.to_dict(),
+                invalid_parents=list(invalid_parents),
+            )
+
     def get_msg(self, hash_str: str):
-        msg = self.msgs.get(hash_str, None)
+        return self.store.get(hash_str)
+
+    def lookup_msg(self, msg_hash: str) -> Message | None:
+        """Finds a message in the tangle or in its stored history"""
+
+        msg = self.get_msg(msg_hash)
+
+        if msg is None and self.storage is not None:
+            msg = self.storage.get_msg(msg_hash)
+
+        return msg
 
-        if msg is not None:
-            return msg
+    def get_address_history(
+        self, address: str, limit: int = None
+    ) -> list[Message]:
+        """Messages sent or received by an address, newest first"""
 
-        return self.all_tips.get(hash_str, None)
+        if self.storage is not None:
+            history = self.storage.get_address_history(address, limit)
+
+            if history is not None:
+                return history
+
+        # Only the messages in the tangle are known without a database
+        history = sorted(
+            (
+                m
+                for m in self.all_msgs.values()
+                if address in (m.node_id, m.payload.get("receiver", None))
+            ),
+            key=lambda m: (m.timestamp, m.index),
+            reverse=True,
+        )
+
+        return history[:limit]
 
     def get_direct_children(self, msg_id: str) -> dict[str, Message]:
         if msg_id not in self.msgs:
             return None
 
-        return {_id: m for _id, m in self.msgs.items() if msg_id in m.parents}
+        return {
+            _id: self.msgs[_id]
+            for _id in self.children.get(msg_id)
+            if _id in self.msgs
+        }
 
     def find_msg_from_index(self, msg_id: tuple[str, int]) -> Message | None:
-        return next(
-            (m for m in self.all_msgs.values() if m.id == msg_id), None
-        )
+        msg_hash = self.issuers.find(msg_id)
+
+        if msg_hash is None:
+            return None
+
+        return self.get_msg(msg_hash)
 
     def get_transaction_index(self, address: str) -> int:
-        return sum(1 for m in self.all_msgs.values() if m.address == address)
+        return self.issuers.get_count(address) + self.snapshot.get_count(
+            address
+        )
 
     def find_occurs_in_branch(
         self, msg_hashes: set[str], branch_id: tuple[str, int] = None
     ) -> list[BranchReference]:
         """Finding all the branches that contain a set of messages"""
 
-        if branch_id is None:
-            occurs = []
+        occurs = {}
 
-            for _id in self.branches:
-                occurs += self.find_occurs_in_branch(msg_hashes, branch_id=_id)
+        for msg_hash in msg_hashes:
+            for branch in self.branch_index.get(msg_hash):
+                ref = self.find_root_conflict(branch)
 
-            return occurs
+                if ref is None:
+                    continue
 
-        manager = self.branches.get(branch_id, None)
+                if branch_id is not None and ref.manager.id != branch_id:
+                    continue
 
-        if manager is None:
-            return []
+                occurs[(ref.manager.id, ref.branch.id)] = ref
 
-        occurs = [
-            BranchReference(b, manager)
-            for b in manager.conflicts.values()
-            if b.get_conflict_msgs(msg_hashes)
-        ]
+        return list(occurs.values())
+
+    def find_root_conflict(self, branch: Branch) -> BranchReference | None:
+        """Finds the top level conflict that a nested conflict belongs to"""
+
+        while branch.is_conflict:
+            manager = branch.manager
+
+            if manager.parent is None:
+                if self.branches.get(manager.id, None) is not manager:
+                    return None
 
-        return occurs
+                return BranchReference(branch, manager)
+
+            branch = manager.parent
+
+        return None
 
     def is_message_finalized(self, msg: Message):
         total_weight = 0
@@ -592,9 +1046,192 @@ class Tangle(Signed):
 
         return False
 
+    def is_prunable(self, msg: Message, before: int) -> bool:
+        return (
+            msg.timestamp < before
+            and msg.hash != genesis_msg.hash
+            and not self.branch_index.get(msg.hash)
+            and self.is_message_finalized(msg)
+        )
+
+    def prune(self, before: int) -> list[Message]:
+        """Moves finalized messages older than a timestamp into the snapshot"""
+
+        # The pruner runs alongside the scheduler that adds the messages
+        with self.lock:
+            pruned = [
+                m for m in self.msgs.values() if self.is_prunable(m, before)
+            ]
+
+            self.prune_msgs(pruned)
+
+        return pruned
+
+    def prune_msgs(self, pruned: list[Message]):
+        with self.lock:
+            for msg in pruned:
+                # The balances stay the same as the snapshot keeps them
+                self.remove_msg(msg, update_state=False)
+                self.snapshot.add_msg(msg)
+
+            self.snapshot.update_frontier(
+                [m.hash for m in pruned], self.children
+            )
+
+            if pruned:
+                self.log_event("prune", hashes=[m.hash for m in pruned])
+
+    def is_pruned(self, msg: Message) -> bool:
+        if msg.hash in self.store:
+            return False
+
+        # Older messages can still be accepted if they weren't finalized
+        if msg.hash in self.snapshot:
+            return True
+
+        return self.storage is not None and self.storage.is_pruned(msg.hash)
+
+    def log_event(self, event_type: str, **data):
+        if self.storage is not None:
+            self.storage.log_event(event_type, **data)
+
+    def log_branch(self, event_type: str, manager: BranchManager, **data):
+        """Logs a change to a single branch manager after it was made"""
+
+        self.log_event(
+            event_type, nesting=manager.nesting, manager=manager.id, **data
+        )
+
+    def replay_event(self, event: dict):
+        """Applies an event from the write-ahead log"""
+
+        event_type = event["type"]
+
+        if event_type == "add_msg":
+            msg = message_lookup(event["msg"])
+
+            if msg is not None:
+                self.add_msg(msg, event["invalid_parents"])
+
+        elif event_type == "remove_msg":
+            msg = self.get_msg(event["hash"])
+
+            if msg is not None:
+                self.remove_msg(msg)
+
+        elif event_type == "swap":
+            old, new = (
+                [message_lookup(m) for m in event[k]] for k in ("old", "new")
+            )
+
+            if None in old or None in new:
+                return
+
+            old_branch, new_branch = Branch(old[0]), Branch(new[0])
+
+            old_branch.add_msgs(old[1:])
+            new_branch.add_msgs(new[1:])
+
+            self.swap_branch(old_branch, new_branch)
+
+        elif event_type == "prune":
+            # Pruning the logged messages as finality may differ on replay
+            msgs = [self.get_msg(h) for h in event["hashes"]]
+
+            self.prune_msgs([m for m in msgs if m is not None])
+
+        elif event_type in BRANCH_EVENTS:
+            self.replay_branch_event(event)
+
+    def replay_branch_event(self, event: dict):
+        event_type, nesting = event["type"], event["nesting"]
+
+        if event_type == "add_branch":
+            manager = BranchManager.from_dict(event["branch"])
+
+            if not nesting:
+                self.add_branch(manager)
+                return
+
+            # The last layer of the nesting is the branch it was added to
+            (m, b), nesting = nesting[-1], nesting[:-1]
+
+            parent = self.find_branch_manager(nesting, m)
+            branch = None if parent is None else parent.get_branch(b)
+
+            if branch is not None:
+                branch.add_branch(manager)
+
+            return
+
+        manager = self.find_branch_manager(nesting, event["manager"])
+
+        if manager is None:
+            return
+
+        if event_type == "remove_branch":
+            self.remove_branch(manager.id)
+            return
+
+        data = event["branch"]
+
+        # New conflicts are logged with their messages
+        if isinstance(data, dict):
+            branch = Branch.from_dict(data)
+        else:
+            branch = manager.get_branch(data)
+
+        if branch is None:
+            return
+
+        if event_type == "add_conflict":
+            manager.add_conflict(branch)
+
+        elif event_type == "set_main_branch":
+            manager.set_main_branch(branch)
+
+        elif event_type == "branch_msg":
+            msg = message_lookup(event["msg"])
+
+            if msg is not None:
+                branch.add_msg(msg, event["invalid_parents"])
+
+        elif event_type == "branch_invalid_msg":
+            branch.state.add_invalid_msg(event["hash"])
+
+        elif event_type == "remove_branch_msgs":
+            for msg_hash in event["hashes"]:
+                if msg_hash in branch.msgs:
+                    branch.remove_msg(branch.msgs[msg_hash])
+
+    def find_branch_manager(
+        self, nesting: list, manager_id: tuple[str, int]
+    ) -> BranchManager | None:
+        """Finds a branch manager from the branches that it is nested in"""
+
+        managers = self.branches
+
+        for m, b in nesting:
+            manager = managers.get(tuple(m), None)
+            branch = None if manager is None else manager.get_branch(b)
+
+            if branch is None:
+                return None
+
+            managers = branch.branches
+
+        return managers.get(tuple(manager_id), None)
+
+    def add_branch(self, manager: BranchManager):
+        self.remove_branch(manager.id)
+
+        self.branches[manager.id] = manager
+
+        manager.attach(self.branch_index)
+
     def remove_branch(self, branch_id: tuple[str, int]):
         if branch_id in self.branches:
-            del self.branches[branch_id]
+            self.branches.pop(branch_id).detach()
 
     def find_duplicates_from_branches(
         self, msg: Message, parent_branches: list[BranchReference]
@@ -628,7 +1265,11 @@ class Tangle(Signed):
         if duplicate:
             # Adding the to the branch
             branch = Branch(msg)
-            deep_ref.branch.branches[msg.id].add_conflict(branch)
+
+            manager = deep_ref.branch.branches[msg.id]
+            manager.add_conflict(branch)
+
+            self.log_branch("add_conflict", manager, branch=branch.to_dict())
 
         else:
             duplicate = deep_ref.branch.find_new_duplicate(msg)
@@ -642,6 +1283,13 @@ class Tangle(Signed):
             for p in children.values():
                 deep_ref.branch.remove_msg(p)
 
+            self.log_branch(
+                "remove_branch_msgs",
+                deep_ref.manager,
+                branch=deep_ref.branch.id,
+                hashes=list(children),
+            )
+
             # Creating a branch from the duplicate
             c_branch = Branch(duplicate)
             c_branch.add_msgs(list(children.values()))
@@ -661,6 +1309,8 @@ class Tangle(Signed):
 
             deep_ref.branch.add_branch(manager)
 
+            self.log_branch("add_branch", manager, branch=manager.to_dict())
+
         # Updating the branch manager in the tangle
         self.update_branch_manager(deep_ref.manager)
 
@@ -671,50 +1321,40 @@ class Tangle(Signed):
 
     def update_branch_manager(self, manager: BranchManager):
         def update(
-            bm: dict[tuple[str, int], BranchManager], nest: list[list[str]]
+            bm: dict[tuple[str, int], BranchManager],
+            nest: list[list[str]],
+            parent: Branch = None,
         ):
             if len(nest):
                 m, b = nest[0]
 
-                bm[m].conflicts[b].branches = update(
-                    bm[m].conflicts[b].branches, nest[1:], manager
-                )
-            else:
+                branch = bm[m].conflicts[b]
+                branch.branches = update(branch.branches, nest[1:], branch)
+
+            elif bm.get(manager.id, None) is not manager:
                 bm[manager.id] = manager
 
+                manager.parent = parent
+                manager.attach(self.branch_index)
+
             return bm
 
         self.branches = update(self.branches, manager.nesting)
 
-    def get_state(self, ref: BranchReference):
-        def get_branch_state(
-            nest: list[list[str]],
-            main: bool = False,
-            state: TangleState = None,
-        ):
-            m, b = (
-                nest[0] if len(nest) else ref.manager.id,
-                ref.branch.id,
-            )
-
-            branch = self.branches[m].conflicts[b]
+    def get_state(self, ref: BranchReference) -> LayeredTangleState:
+        state = LayeredTangleState(self.state)
 
-            new_branch = self.branches[m].main_branch if main else branch
+        branch, manager = ref.branch, ref.manager
 
-            if state is None:
-                state = new_branch.state
-            else:
-                state = state.merge(new_branch.state)
+        # Stacking the conflict states from the branch up to the main tangle
+        while manager is not None:
+            state.push(branch.state)
+            state.push(manager.main_branch.state, add=False)
 
-            if len(nest):
-                return get_branch_state(branch.branches, nest[1:], state)
+            branch = manager.parent
+            manager = None if branch is None else branch.manager
 
-            return state
-
-        branch_state = get_branch_state(ref.manager.nesting)
-        main_state = get_branch_state(ref.manager.nesting, main=True)
-
-        return self.state.merge(branch_state).merge(main_state, add=False)
+        return state
 
     def create_new_branch(self, msg: Message, conflict: Message):
         if msg.id in self.branches:
@@ -743,21 +1383,15 @@ class Tangle(Signed):
         )
         manager.add_conflict(branch)
 
-        self.branches[msg.id] = manager
+        self.add_branch(manager)
 
-    @lru_cache(maxsize=64)
-    def get_difficulty(self, msg: Message):
-        def _in_window(m):
-            return (
-                m.node_id == msg.node_id
-                and m.timestamp > msg.timestamp - TIME_WINDOW
-                and m.timestamp < msg.timestamp
-            )
+        self.log_branch("add_branch", manager, branch=manager.to_dict())
 
-        # Amount of messages in the last time window
-        msg_count = len(list(filter(_in_window, self.msgs.values())))
+    def get_difficulty(self, msg: Message):
+        return self.difficulty.get_difficulty(msg.node_id, msg.timestamp)
 
-        return BASE_DIFFICULTY + int(GAMMA * msg_count)
+    def get_issuer_rate(self, address: str) -> float:
+        return self.difficulty.get_rate(address)
 
     def get_msgs_as_dict(self):
         return [m.to_dict() for m in self.msgs.values()]
@@ -775,18 +1409,26 @@ class Tangle(Signed):
             "branches": self.get_branches_as_dict(),
             "strong_tips": self.get_tips_as_dict(self.strong_tips),
             "weak_tips": self.get_tips_as_dict(self.weak_tips),
+            "state": {
+                "wallets": self.state.wallets,
+                "invalid_msg_pool": self.state.invalid_msg_pool.to_dict(),
+            },
+            "snapshot": self.snapshot.to_dict(),
+            "commitment": self.commitment.to_dict(),
             "signature": self.signature,
         }
 
     def add_hash(self):
-        self.hash = get_raw_hash("".join(str(s) for s in self.to_dict()))
+        # Branches are only committed to when signing as they change in place
+        self.commitment.set_branches(self.get_branches_as_dict())
+
+        self.hash = self.commitment.root
 
     @classmethod
     def from_dict(cls, data: dict, wallet: Wallet):
         tangle_data = data.get("msgs", None)
         strong_tips_data = data.get("strong_tips", None)
         weak_tips_data = data.get("weak_tips", None)
-        branch_data = data.get("branches", None)
 
         signature = data.get("signature", None)
 
@@ -799,15 +1441,130 @@ class Tangle(Signed):
         else:
             signature = None
 
-        tangle = cls(signature=signature)
+        # Trusting the saved statuses and balances if they are consistent
+        tangle = cls.load_bulk(data, signature)
+
+        if tangle is None:
+            tangle = cls.load_replay(data, signature)
+
+        tangle = tangle.check_save(data.get("commitment", None), wallet)
+
+        # Checking the signature of every message when the save is signed
+        if secure_storage:
+            tangle = tangle.check_signatures()
+
+        return tangle
+
+    @staticmethod
+    def load_snapshot(data: dict) -> Snapshot:
+        snapshot_data = data.get("snapshot", None)
+
+        if snapshot_data is None:
+            return Snapshot()
+
+        return Snapshot.from_dict(snapshot_data)
+
+    @classmethod
+    def load_bulk(cls, data: dict, signature: str = None):
+        """
+        Builds the tangle from its saved statuses and balances in a single
+        pass, returning None if they don't line up with the messages
+        """
+
+        state_data = data.get("state", None)
+
+        if state_data is None:
+            return None
+
+        snapshot = cls.load_snapshot(data)
+
+        pools = []
+        known = set(snapshot.frontier)
+
+        for key in ("msgs", "strong_tips", "weak_tips"):
+            pool = {}
+
+            for m_data in data[key]:
+                msg = message_lookup(m_data)
+
+                # Every message and hash has to be valid and unique
+                if msg is None or msg.hash in known:
+                    return None
+
+                pool[msg.hash] = msg
+                known.add(msg.hash)
+
+            pools.append(pool)
+
+        msgs, strong_tips, weak_tips = pools
+
+        if genesis_msg.hash not in msgs:
+            return None
+
+        issued = 0
+
+        for pool in pools:
+            for msg in pool.values():
+                # Parents have to be retained or part of the pruned frontier
+                if any(p not in known for p in msg.parent_hashes):
+                    return None
+
+                if msg.node_id == genesis_msg.node_id:
+                    issued += msg.payload.get("amt", 0)
+
+        state = TangleState(
+            dict(state_data["wallets"]), state_data["invalid_msg_pool"]
+        )
+
+        balances = state.wallets.values()
+
+        # Coins are only created by genesis messages so the totals must match
+        if any(b < 0 for b in balances) or sum(balances) != issued + sum(
+            snapshot.state.wallets.values()
+        ):
+            return None
+
+        branches = [
+            BranchManager.from_dict(b) for b in data.get("branches", [])
+        ]
+
+        return cls(
+            msgs=msgs,
+            strong_tips=strong_tips,
+            weak_tips=weak_tips,
+            branches={m.id: m for m in branches},
+            state=state,
+            snapshot=snapshot,
+            signature=signature,
+        )
+
+    @classmethod
+    def load_replay(
+        cls, data: dict, signature: str = None, skip: set[str] = None
+    ):
+        """Builds the tangle by adding each saved message again"""
+
+        if skip is None:
+            skip = set()
+
+        snapshot = cls.load_snapshot(data)
+
+        # Starting from the balances of the pruned history
+        tangle = cls(
+            signature=signature,
+            snapshot=snapshot,
+            state=TangleState(dict(snapshot.state.wallets)),
+        )
 
         # Adding the messages to the tangle
         for m_data in (
-            list(reversed(tangle_data)) + strong_tips_data + weak_tips_data
+            list(reversed(data["msgs"]))
+            + data["strong_tips"]
+            + data["weak_tips"]
         ):
             msg = message_lookup(m_data)
 
-            if msg is None:
+            if msg is None or msg.hash in skip:
                 continue
 
             if msg.hash in tangle.msgs:
@@ -817,34 +1574,167 @@ class Tangle(Signed):
             tangle.add_msg(msg)
 
         # Adding the branches
-        tangle.branches = {
-            (m := BranchManager.from_dict(b)).id: m for b in branch_data
-        }
+        for b in data.get("branches", []):
+            tangle.add_branch(BranchManager.from_dict(b))
+
+        return tangle
+
+    def check_save(self, commitment: dict | None, wallet: Wallet):
+        """
+        Checks the tangle against the commitment it was saved with, only
+        dropping the messages in the buckets that don't match
+        """
 
-        tangle.add_hash()
+        # Saves without a valid commitment can only be checked as a whole
+        if commitment is None or not self.commitment.is_valid_dict(commitment):
+            if self.is_save_valid(wallet):
+                return self
 
-        # Checking if the data was tampered
-        if (
-            secure_storage
-            and Wallet.is_signature_valid(
-                wallet.address, signature=tangle.signature, msg=tangle.hash
+            logging.warning(
+                "Discarding the saved tangle as it doesn't match its signature"
             )
-            is False
+
+            return type(self)()
+
+        # Checking if the saved commitment was tampered
+        if secure_storage and not Wallet.is_signature_valid(
+            wallet.address, signature=self.signature, msg=commitment["root"]
         ):
-            return cls()
+            logging.warning(
+                "Discarding the saved tangle as its commitment isn't signed"
+            )
 
-        return tangle
+            return type(self)()
 
-    def save(self, wallet: Wallet):
-        # Signing the tangle to prevent tampering
         self.add_hash()
-        self.sign(wallet)
 
-        # Saving the tangle to a file
-        save_storage_file(TANGLE_PATH, self.to_dict())
+        (
+            buckets,
+            balances_valid,
+            branches_valid,
+        ) = self.commitment.find_corrupted(commitment)
+
+        if not branches_valid:
+            logging.warning(
+                "Dropping the saved branches as they don't match the "
+                "commitment"
+            )
+
+            for branch_id in list(self.branches):
+                self.remove_branch(branch_id)
+
+        if not buckets and balances_valid:
+            return self
+
+        buckets = set(buckets)
+
+        corrupted = {
+            h
+            for h in self.all_msgs
+            if self.commitment.get_msg_bucket(h) in buckets
+        }
+
+        if corrupted:
+            logging.warning(
+                f"Dropping {len(corrupted)} messages from {len(buckets)} "
+                "corrupted ranges of the saved tangle"
+            )
+        else:
+            logging.warning("Rebuilding the corrupted balances of the tangle")
+
+        # The balances are rebuilt from the messages that are left
+        return self.load_replay(self.to_dict(), self.signature, corrupted)
+
+    def check_signatures(self):
+        """Drops the messages with invalid signatures, verified in parallel"""
+
+        msgs = [
+            m for m in self.all_msgs.values() if m.hash != genesis_msg.hash
+        ]
+
+        invalid = {
+            m.hash for m, valid in zip(msgs, verify_many(msgs)) if not valid
+        }
+
+        if not invalid:
+            return self
+
+        logging.warning(
+            f"Dropping {len(invalid)} messages with invalid signatures from "
+            "the saved tangle"
+        )
+
+        return self.load_replay(self.to_dict(), self.signature, invalid)
+
+    def is_save_valid(self, wallet: Wallet) -> bool:
+        if not secure_storage:
+            return True
+
+        self.add_hash()
+
+        return self.is_signed and Wallet.is_signature_valid(
+            wallet.address, signature=self.signature, msg=self.hash
+        )
+
+    def set_storage(self, storage: StorageBackend):
+        self.storage = storage
+        self.storage.attach(self)
+
+    def save(self, wallet: Wallet):
+        if self.storage is None:
+            self.set_storage(storage_backends[storage_backend]())
+
+        with self.lock:
+            # Signing the tangle to prevent tampering
+            self.add_hash()
+            self.sign(wallet)
+
+            self.storage.save(self, wallet)
+
+    def copy(self) -> "FrozenTangle":
+        return FrozenTangle(self)
+
+    def checkpoint(self, wallet: Wallet) -> int:
+        """
+        Saves the tangle while it keeps changing, returning the size of the
+        save in bytes
+        """
+
+        if self.storage is None:
+            self.set_storage(storage_backends[storage_backend]())
+
+        return self.storage.checkpoint(self, wallet)
 
     @classmethod
-    def from_save(cls, wallet: Wallet):
-        tangle_data = load_storage_file(TANGLE_PATH)
+    def from_save(cls, wallet: Wallet, storage: StorageBackend = None):
+        if storage is None:
+            storage = storage_backends[storage_backend]()
+
+        tangle = storage.load(wallet)
+        tangle.set_storage(storage)
+
+        # Only the loaded tangle keeps the columns, not the ones built to load it
+        if tangle_analytics:
+            tangle.enable_analytics()
+
+        return tangle
 
-        return cls.from_dict(tangle_data, wallet)
+
+class FrozenTangle(Tangle):
+    """
+    Copy of the parts of a tangle that are saved so that it can be
+    serialized while the tangle keeps changing (has none of the indexes)
+    """
+
+    def __init__(self, tangle: Tangle):
+        Signed.__init__(self, hash=tangle.hash, signature=tangle.signature)
+
+        self.store = tangle.store.copy()
+        self.state = tangle.state.copy()
+        self.snapshot = tangle.snapshot.copy()
+        self.commitment = tangle.commitment.copy()
+
+        self.branches_data = tangle.get_branches_as_dict()
+
+    def get_branches_as_dict(self):
+        return self.branches_data
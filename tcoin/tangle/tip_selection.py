@@ -0,0 +1,226 @@
+import math
+import random
+from collections import deque
+from typing import TYPE_CHECKING
+
+from tcoin.config import max_walk_steps, walk_alpha, walk_window
+
+if TYPE_CHECKING:
+    from .messages import Message
+    from .tangle import Tangle
+
+
+class TipSelector:
+    """Chooses which tips a new message should approve"""
+
+    name: str = ...
+
+    def attach(self, tangle: "Tangle"):
+        """Called when the selector starts being used by a tangle"""
+        ...
+
+    def add_msg(self, tangle: "Tangle", msg: "Message"):
+        ...
+
+    def remove_msg(self, tangle: "Tangle", msg: "Message"):
+        ...
+
+    def select(self, tangle: "Tangle", amt: int) -> list[str]:
+        ...
+
+
+class UniformTipSelector(TipSelector):
+    name = "uniform"
+
+    def select(self, tangle: "Tangle", amt: int) -> list[str]:
+        return tangle.store.sample_tips(amt)
+
+
+class CumulativeWeights:
+    """Cumulative approval weights of the messages in a recent time window"""
+
+    def __init__(self, window: int, max_updates: int):
+        self.window = window
+        self.max_updates = max_updates
+
+        self.weights: dict[str, int] = {}  # hash: cumulative weight
+        self.recent: deque[tuple[int, str]] = deque()  # (timestamp, hash)
+
+    def __contains__(self, msg_hash: str) -> bool:
+        return msg_hash in self.weights
+
+    def get(self, msg_hash: str) -> int:
+        return self.weights.get(msg_hash, 0)
+
+    def update_ancestors(self, tangle: "Tangle", msg: "Message", amt: int):
+        min_timestamp = msg.timestamp - self.window
+
+        visited = set()
+        to_visit = list(msg.parent_hashes)
+
+        # Capping the amount of ancestors updated for a single message
+        while to_visit and len(visited) < self.max_updates:
+            _id = to_visit.pop()
+
+            if _id in visited:
+                continue
+
+            visited.add(_id)
+
+            p_msg = tangle.get_msg(_id)
+
+            # Ancestors outside of the window are never walked through
+            if p_msg is None or p_msg.timestamp < min_timestamp:
+                continue
+
+            weight = self.weights.get(_id, p_msg.approval_weight)
+            self.weights[_id] = weight + amt
+
+            to_visit.extend(p_msg.parent_hashes)
+
+    def add(self, tangle: "Tangle", msg: "Message"):
+        if msg.hash in self.weights:
+            return
+
+        self.weights[msg.hash] = msg.approval_weight
+        self.recent.append((msg.timestamp, msg.hash))
+
+        self.update_ancestors(tangle, msg, msg.approval_weight)
+
+        # Forgetting the weights of messages that left the window
+        while self.recent and self.recent[0][0] < msg.timestamp - self.window:
+            _, _id = self.recent.popleft()
+            self.weights.pop(_id, None)
+
+    def remove(self, tangle: "Tangle", msg: "Message"):
+        if self.weights.pop(msg.hash, None) is None:
+            return
+
+        self.update_ancestors(tangle, msg, -msg.approval_weight)
+
+
+class WeightedWalkTipSelector(TipSelector):
+    """
+    Selects tips using random walks biased towards heavier children
+
+    The walks start from recent approved messages and move to a child with
+    a probability proportional to exp(alpha * cumulative weight).
+    """
+
+    name = "weighted-walk"
+
+    def __init__(
+        self,
+        *,
+        alpha: float = walk_alpha,
+        max_steps: int = max_walk_steps,
+        window: int = walk_window,
+    ):
+        self.alpha = alpha
+        self.max_steps = max_steps
+
+        self.weights = CumulativeWeights(window, max_steps)
+
+    def attach(self, tangle: "Tangle"):
+        self.weights = CumulativeWeights(
+            self.weights.window, self.weights.max_updates
+        )
+
+        if not tangle.all_msgs:
+            return
+
+        latest = max(m.timestamp for m in tangle.all_msgs.values())
+
+        recent_msgs = [
+            m
+            for m in tangle.all_msgs.values()
+            if m.timestamp >= latest - self.weights.window
+        ]
+
+        for msg in sorted(recent_msgs, key=lambda m: m.timestamp):
+            self.weights.add(tangle, msg)
+
+    def add_msg(self, tangle: "Tangle", msg: "Message"):
+        self.weights.add(tangle, msg)
+
+    def remove_msg(self, tangle: "Tangle", msg: "Message"):
+        self.weights.remove(tangle, msg)
+
+    def get_starts(self, tangle: "Tangle", amt: int) -> list[str]:
+        starts = []
+
+        # Searching backwards from the newest message for approved messages
+        for i, (_, _id) in enumerate(reversed(self.weights.recent)):
+            if len(starts) >= amt or i >= self.max_steps:
+                break
+
+            if _id in tangle.msgs:
+                starts.append(_id)
+
+        return starts
+
+    def walk(self, tangle: "Tangle", start: str, max_steps: int):
+        current = start
+
+        for step in range(max_steps):
+            children = [
+                c for c in tangle.children.get(current) if c in tangle.store
+            ]
+
+            if not children:
+                if current in tangle.all_tips:
+                    return current, step
+
+                return None, step
+
+            current_weight = self.weights.get(current)
+
+            # Normalizing by the current weight to avoid overflowing
+            weights = [
+                math.exp(
+                    max(
+                        self.alpha * (self.weights.get(c) - current_weight),
+                        -50,
+                    )
+                )
+                for c in children
+            ]
+
+            current = random.choices(children, weights=weights)[0]
+
+        return None, max_steps
+
+    def select(self, tangle: "Tangle", amt: int) -> list[str]:
+        tips = set()
+
+        # Total amount of steps all the walks are allowed to take
+        budget = self.max_steps * amt
+
+        starts = self.get_starts(tangle, amt)
+
+        for _ in range(amt):
+            if not starts or budget <= 0:
+                break
+
+            start = random.choice(starts)
+
+            tip, steps = self.walk(tangle, start, min(self.max_steps, budget))
+            budget -= steps
+
+            if tip is not None:
+                tips.add(tip)
+
+        # Filling the remaining parents uniformly to keep the tip pool small
+        if len(tips) < amt:
+            for _id in tangle.store.sample_tips(amt):
+                if len(tips) >= amt:
+                    break
+
+                tips.add(_id)
+
+        return list(tips)
+
+
+tip_selectors = {
+    s.name: s for s in (UniformTipSelector, WeightedWalkTipSelector)
+}
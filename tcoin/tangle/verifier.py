@@ -0,0 +1,93 @@
+from tcoin.config import verify_min_batch, verify_workers
+from tcoin.utils import ProcessPool
+from tcoin.wallet import Wallet
+
+from .signed import Signed
+
+
+def verify(address: str, msg_hash: str, signature: str) -> bool:
+    try:
+        return Wallet.is_signature_valid(address, signature, msg_hash)
+
+    # Malformed addresses and signatures can't be parsed
+    except Exception:
+        return False
+
+
+def verify_chunk(chunk: list[tuple[str, str, str]]) -> list[bool]:
+    return [verify(*key) for key in chunk]
+
+
+class SignatureVerifier:
+    """
+    Verifies batches of signatures on a pool of processes so that they
+    aren't verified one at a time on the thread holding the GIL
+
+    Batches smaller than min_batch are verified in the calling thread as
+    sending them to the pool would cost more than it saves.
+    """
+
+    def __init__(
+        self,
+        workers: int = verify_workers,
+        *,
+        min_batch: int = verify_min_batch,
+    ):
+        self.pool = ProcessPool(workers)
+
+        self.workers = self.pool.workers
+        self.min_batch = min_batch
+
+    def verify_keys(self, keys: list[tuple[str, str, str]]) -> list[bool]:
+        if len(keys) < self.min_batch:
+            return verify_chunk(keys)
+
+        # Splitting the batch so that the workers finish at around the same time
+        size = -(-len(keys) // (self.workers * 4))
+
+        chunks = [keys[i : i + size] for i in range(0, len(keys), size)]
+
+        return [
+            v for c in self.pool.get().map(verify_chunk, chunks) for v in c
+        ]
+
+    def verify_many(self, signed: list[Signed]) -> list[bool]:
+        """Checks the signature of each object, in the same order"""
+
+        results = [False] * len(signed)
+        unverified: list[tuple[int, tuple[str, str, str]]] = []
+
+        for i, s in enumerate(signed):
+            key = (s.address, s.hash, s.signature)
+
+            if not all(isinstance(k, str) for k in key):
+                continue
+
+            # Skipping the signatures that were already verified
+            if Signed.signature_cache.check(key):
+                results[i] = True
+            else:
+                unverified.append((i, key))
+
+        if not unverified:
+            return results
+
+        valid = self.verify_keys([key for _, key in unverified])
+
+        for (i, key), v in zip(unverified, valid):
+            if v:
+                Signed.signature_cache.add(key)
+                results[i] = True
+
+        return results
+
+    def close(self):
+        self.pool.close()
+
+
+# Shared by every node so that there is only a single pool
+verifier = SignatureVerifier()
+
+
+def verify_many(signed: list[Signed]) -> list[bool]:
+    return verifier.verify_many(signed)
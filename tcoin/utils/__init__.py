@@ -1,3 +1,5 @@
+from .cache import *
 from .misc import *
+from .pool import *
 from .pow import *
 from .storage import *
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class LRUCache:
+    """
+    Least recently used mapping that keeps at most size entries and counts
+    how often the entries it is asked for are found
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+
+        # Connection threads use the caches too
+        self.lock = Lock()
+
+        self.entries: OrderedDict = OrderedDict()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+            return self.entries[key]
+
+    def put(self, key, value=None):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+
+            self.evict()
+
+    def evict(self):
+        # Forgetting the least recently used entries
+        while len(self.entries) > self.size:
+            key, _ = self.entries.popitem(last=False)
+            self.evictions += 1
+
+            self.on_evict(key)
+
+    def on_evict(self, key):
+        """Called with the lock held for every entry that is evicted"""
+        ...
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
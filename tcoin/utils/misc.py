@@ -1,6 +1,16 @@
+import sys
 from typing import Any, Type
 
 
 def check_var_types(*type_pairs: tuple[Any, Type]):
     for var, _type in type_pairs:
         yield isinstance(var, _type)
+
+
+def intern_str(value: Any):
+    """Interns strings so that equal ones share a single object"""
+
+    if type(value) is str:
+        return sys.intern(value)
+
+    return value
@@ -0,0 +1,48 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import Callable
+
+# Spawning the workers since forking could copy held locks
+spawn_context = multiprocessing.get_context("spawn")
+
+
+class ProcessPool:
+    """Pool of spawned processes that is only started once it is used"""
+
+    def __init__(
+        self,
+        workers: int = 0,
+        *,
+        initializer: Callable = None,
+        initargs: tuple = (),
+    ):
+        if workers == 0:
+            workers = os.cpu_count() or 1
+
+        self.workers = workers
+
+        self.initializer = initializer
+        self.initargs = initargs
+
+        self.lock = Lock()
+        self.executor: ProcessPoolExecutor | None = None
+
+    def get(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=spawn_context,
+                    initializer=self.initializer,
+                    initargs=self.initargs,
+                )
+
+            return self.executor
+
+    def close(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
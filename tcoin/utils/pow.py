@@ -1,7 +1,23 @@
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
 from hashlib import sha256
+from threading import Lock
 
+from tcoin.config import pow_workers
 from tcoin.constants import MAX_NONCE
 
+from .pool import ProcessPool, spawn_context
+
+POW_CHUNK_SIZE = 2**15  # nonces searched by a worker at a time
+STOP_CHECK_RATE = 2**10  # nonces searched between checks for a solution
+
+# Start of the chunk that the best nonce was found in (set in the workers)
+_found = None
+
 
 def get_target(difficulty: int) -> int:
     return 2 ** (256 - difficulty)
@@ -19,13 +35,169 @@ def get_pow_hash(msg: str, nonce: int) -> str:
     return get_raw_hash(f"{msg}{nonce}")
 
 
+def get_target_bytes(target: int) -> bytes:
+    # The largest valid digest always fits, even when every hash is valid
+    return (min(target, 2**256) - 1).to_bytes(32, "big")
+
+
+def search_nonces(msg: str, target: int, start: int, end: int):
+    """
+    Finds the first nonce in [start, end) with a valid hash
+
+    The message is only hashed once and its state is copied for every nonce,
+    which gives the same hashes as get_pow_hash. Big endian digests compare
+    like the numbers they encode so they are checked without parsing them.
+    """
+
+    prefix = sha256(msg.encode())
+    limit = get_target_bytes(target)
+
+    copy = prefix.copy
+
+    for nonce in range(start, end):
+        h = copy()
+        h.update(b"%d" % nonce)
+
+        digest = h.digest()
+
+        if digest <= limit:
+            return digest.hex(), nonce
+
+    return None
+
+
 def pow(msg: str, difficulty: int):
-    target = get_target(difficulty)
+    result = search_nonces(msg, get_target(difficulty), 0, MAX_NONCE)
+
+    return False if result is None else result
+
+
+def _init_worker(found):
+    global _found
+
+    _found = found
+
+
+def _search_chunk(msg: str, target: int, start: int, end: int):
+    for s in range(start, end, STOP_CHECK_RATE):
+        # Giving up once a nonce was found in an earlier chunk
+        if _found.value < start:
+            return None
+
+        result = search_nonces(msg, target, s, min(s + STOP_CHECK_RATE, end))
+
+        if result is not None:
+            with _found.get_lock():
+                _found.value = min(_found.value, start)
+
+            return result
+
+    return None
+
+
+class PowSolver:
+    """
+    Solves proof of work on a pool of processes that each search chunks of
+    the nonces in order
+
+    Once a nonce is found, the chunks after it are abandoned while the ones
+    before it are finished so that the smallest nonce is always returned,
+    just like a single core would.
+    """
+
+    def __init__(
+        self, workers: int = pow_workers, chunk_size: int = POW_CHUNK_SIZE
+    ):
+        self.pool = ProcessPool(workers, initializer=_init_worker)
+
+        self.workers = self.pool.workers
+        self.chunk_size = chunk_size
+
+        self.lock = Lock()
+
+        # Start of the chunk with the best nonce, shared with the workers
+        self.found = None
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        # Only sharing memory with the workers once they are needed
+        if self.found is None:
+            self.found = spawn_context.Value("q", MAX_NONCE)
+            self.pool.initargs = (self.found,)
+
+        return self.pool.get()
+
+    def solve(self, msg: str, difficulty: int):
+        # Easy work is solved before the workers would even get the chunks
+        if self.workers == 1 or 2**difficulty < self.chunk_size:
+            return pow(msg, difficulty)
+
+        # Only one solve at a time can use the shared solution
+        with self.lock:
+            return self.solve_in_pool(msg, difficulty)
+
+    def solve_in_pool(self, msg: str, difficulty: int):
+        target = get_target(difficulty)
+        pool = self.get_pool()
+
+        self.found.value = MAX_NONCE
+
+        chunks: dict[int, Future] = {}  # start: future
+        abandoned: list[Future] = []
+
+        start = 0
+        best = None
+
+        while True:
+            # Keeping every worker busy until a nonce is found
+            while (
+                best is None
+                and start < MAX_NONCE
+                and len(chunks) < self.workers * 2
+            ):
+                end = min(start + self.chunk_size, MAX_NONCE)
+
+                chunks[start] = pool.submit(
+                    _search_chunk, msg, target, start, end
+                )
+                start = end
+
+            if not chunks:
+                break
+
+            done, _ = wait(chunks.values(), return_when=FIRST_COMPLETED)
+
+            for s, f in list(chunks.items()):
+                if f not in done:
+                    continue
+
+                del chunks[s]
+
+                result = f.result()
+
+                if result and (best is None or result[1] < best[1]):
+                    best = result
+
+            if best is not None:
+                # Only the chunks before the nonce can have a smaller one
+                for s in [s for s in chunks if s > best[1]]:
+                    f = chunks.pop(s)
+
+                    if not f.cancel():
+                        abandoned.append(f)
+
+        # Letting the abandoned chunks stop before the solution is reset
+        wait(abandoned)
+
+        return False if best is None else best
+
+    def close(self):
+        with self.lock:
+            self.pool.close()
+
 
-    for nonce in range(MAX_NONCE):
-        hash_result = get_pow_hash(msg, nonce)
+# Shared by every message so that there is only a single pool
+pow_solver = PowSolver()
 
-        if is_valid_hash(hash_result, target):
-            return hash_result, nonce
 
-    return False
+def solve_pow(msg: str, difficulty: int):
+    return pow_solver.solve(msg, difficulty)
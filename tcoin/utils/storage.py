@@ -1,11 +1,31 @@
 import json
+import logging
 import os
+import time
+from hashlib import sha256
+from threading import Lock
+from typing import Callable, Iterator
 
-from tcoin.config import storage_path
+from tcoin.config import storage_path, wal_batch_size, wal_sync_interval
 
 
-def _get_storage_path(name: str):
-    return f"{storage_path}/{name}.json"
+def _get_storage_path(name: str, ext: str = "json"):
+    return f"{storage_path}/{name}.{ext}"
+
+
+def atomic_write(path: str, data: str | bytes) -> int:
+    """Replaces a file with the data, returning the size of the file"""
+
+    # Writing to a temporary file first so a crash can't corrupt the file
+    with open(f"{path}.tmp", "wb" if isinstance(data, bytes) else "w") as f:
+        f.write(data)
+
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(f"{path}.tmp", path)
+
+    return os.path.getsize(path)
 
 
 def load_storage_file(name: str, default={}):
@@ -18,11 +38,228 @@ def load_storage_file(name: str, default={}):
         return json.load(f)
 
 
-def save_storage_file(name: str, data):
+def save_storage_file(name: str, data) -> int:
+    """Saves the data as JSON, returning the size of the file"""
+
     path = _get_storage_path(name)
 
     if not os.path.exists(storage_path):
         os.mkdir(storage_path)
 
-    with open(path, "w") as f:
-        return json.dump(data, f)
+    return atomic_write(path, json.dumps(data))
+
+
+def append_storage_file(name: str, items: list):
+    """Appends each item as a line of JSON"""
+
+    path = _get_storage_path(name, ext="jsonl")
+
+    if not os.path.exists(storage_path):
+        os.mkdir(storage_path)
+
+    with open(path, "a") as f:
+        for item in items:
+            f.write(json.dumps(item) + "\n")
+
+
+class WriteAheadLog:
+    """
+    Append-only log of events that are written as they happen
+
+    Every event is flushed to the os right away but only synced to the disk
+    once per batch (or sync interval) to keep appends cheap. With a signer,
+    each synced batch is sealed with a signature over the hash of the whole
+    log so that events can't be added or changed without the key.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        batch_size: int = wal_batch_size,
+        sync_interval: float = wal_sync_interval,
+        signer: Callable[[str], str] = None,
+    ):
+        self.path = _get_storage_path(name, ext="wal")
+
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+
+        # Signs the hash of the log at the end of every synced batch
+        self.signer = signer
+
+        self.lock = Lock()
+        self.file = None
+
+        # Running hash of every line in the log file
+        self.digest = None
+
+        # Sequence number of the last event in the log
+        self.seq = 0
+
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def open(self):
+        if not os.path.exists(storage_path):
+            os.mkdir(storage_path)
+
+        self.digest = sha256()
+
+        # Continuing the hash of the lines that are already in the log
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                for line in f:
+                    self.digest.update(line)
+
+        self.file = open(self.path, "a")
+
+    def write_line(self, data: dict):
+        line = json.dumps(data, separators=(",", ":")) + "\n"
+
+        self.file.write(line)
+        self.digest.update(line.encode())
+
+    def append(self, event_type: str, **data) -> int:
+        with self.lock:
+            if self.file is None:
+                self.open()
+
+            self.seq += 1
+
+            self.write_line({"seq": self.seq, "type": event_type, **data})
+            self.file.flush()
+
+            self.pending += 1
+
+            if (
+                self.pending >= self.batch_size
+                or time.monotonic() - self.last_sync >= self.sync_interval
+            ):
+                self._sync()
+
+            return self.seq
+
+    def _sync(self):
+        if self.file is not None and self.pending:
+            if self.signer is not None:
+                self.seal()
+
+            os.fsync(self.file.fileno())
+
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def seal(self):
+        root = self.digest.hexdigest()
+
+        self.write_line(
+            {"type": "seal", "hash": root, "signature": self.signer(root)}
+        )
+        self.file.flush()
+
+    def sync(self):
+        with self.lock:
+            self._sync()
+
+    def replay(
+        self, after: int = 0, verify: Callable[[str, str], bool] = None
+    ) -> Iterator[dict]:
+        """
+        Yields the events that come after a sequence number
+
+        With a verifier, only the events followed by a valid seal are
+        yielded and the rest of the log is cut off.
+        """
+
+        self.seq = max(self.seq, after)
+
+        if not os.path.exists(self.path):
+            return
+
+        digest = sha256()
+
+        # Events since the last seal along with where the valid log ends
+        unsealed, end = [], 0
+
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line is torn if the node crashed while writing
+                    break
+
+                if event["type"] != "seal":
+                    self.seq = max(self.seq, event["seq"])
+
+                    if event["seq"] > after:
+                        unsealed.append(event)
+
+                elif verify is not None:
+                    # The seal has to sign the hash of every line before it
+                    if event["hash"] != digest.hexdigest() or not verify(
+                        event["hash"], event["signature"]
+                    ):
+                        break
+
+                    yield from unsealed
+
+                    unsealed, end = [], f.tell()
+
+                digest.update(line)
+
+                # Events don't wait for a seal if they aren't verified
+                if verify is None:
+                    yield from unsealed
+
+                    unsealed = []
+
+        if verify is None or end == os.path.getsize(self.path):
+            return
+
+        logging.warning(
+            "Dropping the end of the log as it isn't sealed with a valid "
+            "signature"
+        )
+
+        # Later seals would otherwise cover the dropped events
+        if self.file is None:
+            os.truncate(self.path, end)
+
+    def reset(self, upto: int = None):
+        """Empties the log of the events that are part of a save"""
+
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+
+            # Keeping the events that were logged after the save was copied
+            kept = []
+
+            if upto is not None and upto < self.seq:
+                kept = list(self.replay(after=upto))
+
+            atomic_write(
+                self.path,
+                "".join(
+                    json.dumps(event, separators=(",", ":")) + "\n"
+                    for event in kept
+                ),
+            )
+
+            self.open()
+
+            # Sealing the events that were kept again
+            self.pending = len(kept)
+            self._sync()
+
+    def close(self):
+        with self.lock:
+            if self.file is None:
+                return
+
+            self._sync()
+
+            self.file.close()
+            self.file = None
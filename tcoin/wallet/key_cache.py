@@ -0,0 +1,75 @@
+from base58 import b58decode
+from ecdsa import VerifyingKey
+from ecdsa.ellipticcurve import PointJacobi
+from tcoin.config import vk_cache_size, vk_precompute_after
+from tcoin.constants import CURVE, PREFIX
+from tcoin.utils import LRUCache
+
+
+def parse_address(address: str) -> VerifyingKey:
+    # Keeping the order of the curve on the point so it can be precomputed
+    point = PointJacobi.from_bytes(
+        CURVE.curve, b58decode(address[len(PREFIX) :]), order=CURVE.order
+    )
+
+    return VerifyingKey.from_public_point(point, curve=CURVE)
+
+
+class VerifyingKeyCache(LRUCache):
+    """
+    Least recently used cache of the verifying keys parsed from addresses
+
+    Keys that are used often get their multiplication tables precomputed,
+    which makes verifying their signatures about twice as fast.
+    """
+
+    def __init__(
+        self,
+        *,
+        size: int = vk_cache_size,
+        precompute_after: int = vk_precompute_after,
+    ):
+        super().__init__(size)
+
+        self.precompute_after = precompute_after
+
+        self.uses: dict[str, int] = {}  # address: amount of lookups
+
+        self.precomputed = 0
+
+    def get(self, address: str) -> VerifyingKey:
+        vk = super().get(address)
+
+        if vk is None:
+            # Parsing outside of the lock as invalid addresses raise
+            vk = parse_address(address)
+
+            with self.lock:
+                self.uses[address] = 1
+
+            self.put(address, vk)
+
+            return vk
+
+        with self.lock:
+            uses = self.uses.get(address, 0) + 1
+            self.uses[address] = uses
+
+        # Only the lookup that reaches the threshold precomputes
+        if uses == self.precompute_after:
+            vk.precompute()
+            self.precomputed += 1
+
+        return vk
+
+    def on_evict(self, address: str):
+        self.uses.pop(address, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.uses.clear()
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        return {**super().stats, "precomputed": self.precomputed}
@@ -1,12 +1,17 @@
 from base64 import b64decode, b64encode
 
 import ecdsa
-from base58 import b58decode, b58encode
-from ecdsa import BadSignatureError, VerifyingKey
+from base58 import b58encode
+from ecdsa import BadSignatureError
 from tcoin.constants import CURVE, PREFIX
 
+from .key_cache import VerifyingKeyCache
+
 
 class Wallet:
+    # Keys of the addresses that signatures were verified for
+    vk_cache = VerifyingKeyCache()
+
     def __init__(self, secret: str = None):
         # Creating the signing key
         if secret is None:
@@ -49,6 +54,4 @@ class Wallet:
 
     @classmethod
     def get_vk_from_address(cls, address: str):
-        return VerifyingKey.from_string(
-            b58decode(address[len(PREFIX) :]), curve=CURVE
-        )
+        return cls.vk_cache.get(address)